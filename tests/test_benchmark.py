@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+from posts.benchmark import ROUTES, environment, run_benchmark, seed
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def test_posts_routes_benchmark(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    user = seed(users=3, groups=2, posts=30, comments=60, images=3)
+    results = run_benchmark(user, requests=5)
+    assert set(results) == set(ROUTES)
+    for name, result in results.items():
+        assert set(result['statuses']) <= {'200', '302'}, (
+            f'Маршрут `{name}` ответил ошибкой: {result["statuses"]}'
+        )
+        assert result['queries']['min'] == result['queries']['max'], (
+            f'Число запросов к БД у маршрута `{name}` меняется от запроса '
+            f'к запросу: {result["queries"]}'
+        )
+    for name in ('index', 'group_posts', 'profile', 'post_detail'):
+        assert results[name]['queries']['min'] > 0, (
+            f'Маршрут `{name}` замерен из кеша, а не по запросам к БД'
+        )
+    cached = run_benchmark(user, routes=['index'], requests=2, cached=True)
+    assert cached['index']['queries']['max'] == 0
+    output = os.environ.get('BENCHMARK_JSON')
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(
+                {'environment': environment(), 'routes': results},
+                file, ensure_ascii=False, indent=2, sort_keys=True,
+            )
@@ -0,0 +1,19 @@
+def join_cookie_headers(application):
+    """Склеивает заголовки Cookie запроса ASGI в один.
+
+    Клиенты HTTP/2 присылают каждую cookie отдельным заголовком, а
+    asgiref.wsgi.WsgiToAsgi объединяет повторы через запятую, как обычные
+    заголовки. Разбор cookie в Django ждёт разделитель '; ', поэтому
+    заголовки склеиваются заранее.
+    """
+    async def wrapper(scope, receive, send):
+        if scope['type'] == 'http':
+            headers = scope.get('headers', [])
+            cookies = [value for name, value in headers if name == b'cookie']
+            if len(cookies) > 1:
+                scope = dict(scope, headers=[
+                    (name, value) for name, value in headers
+                    if name != b'cookie'
+                ] + [(b'cookie', b'; '.join(cookies))])
+        return await application(scope, receive, send)
+    return wrapper
@@ -0,0 +1,79 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+PINNED_UNTIL_KEY = 'replica_pinned_until'
+
+_state = threading.local()
+
+
+class ReplicaRouter:
+    """Отправляет чтения помеченных представлений на реплику.
+
+    Всё остальное, включая любые записи, идёт в основную базу. Реплика
+    задаётся настройкой REPLICA_DATABASE; пока она пуста, роутер ничего
+    не меняет.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.REPLICA_DATABASE and getattr(_state, 'replica', False):
+            return settings.REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, связи между ними допустимы.
+        return True
+
+
+def is_pinned(request):
+    return request.session.get(PINNED_UNTIL_KEY, 0) > time.time()
+
+
+def read_from_replica(view):
+    """Читает данные представления с реплики.
+
+    Пользователь, который только что что-то записал, в течение
+    REPLICA_STICKY_SECONDS читает из основной базы и видит свои изменения,
+    даже если реплика ещё отстаёт. Внутри primary_reads реплика тоже не
+    используется.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not settings.REPLICA_DATABASE or request.method != 'GET'
+                or is_pinned(request) or getattr(_state, 'primary', False)):
+            return view(request, *args, **kwargs)
+        _state.replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = False
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Читает из основной базы даже в представлениях read_from_replica."""
+    previous = getattr(_state, 'primary', False)
+    _state.primary = True
+    try:
+        yield
+    finally:
+        _state.primary = previous
+
+
+def pin_to_primary(view):
+    """После записи закрепляет чтения пользователя за основной базой."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if settings.REPLICA_DATABASE and request.method == 'POST':
+            request.session[PINNED_UNTIL_KEY] = (
+                time.time() + settings.REPLICA_STICKY_SECONDS)
+        return response
+    return wrapper
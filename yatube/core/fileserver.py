@@ -0,0 +1,207 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.utils.http import http_date, parse_http_date_safe
+
+BLOCK_SIZE = 64 * 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Имена, которые меняются вместе с содержимым: хеш из манифеста статики
+# (12 знаков) и хеш ContentAddressedStorage для картинок постов (64).
+IMMUTABLE_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$|/[0-9a-f]{64}\.\w+$')
+# Заранее сжатые копии из CompressedManifestStaticFilesStorage, в порядке
+# предпочтения.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+TEXT_TYPES = ('application/javascript', 'application/json', 'image/svg+xml')
+
+
+class FileIterator:
+    """Читает из файла length байт кусками по BLOCK_SIZE.
+
+    Атрибут streaming говорит мосту ASGI отправлять куски по мере чтения,
+    а не собирать файл в памяти.
+    """
+
+    streaming = True
+
+    def __init__(self, file, length):
+        self.file = file
+        self.length = length
+
+    def __iter__(self):
+        remaining = self.length
+        while remaining > 0:
+            chunk = self.file.read(min(BLOCK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+class FileServer:
+    """WSGI-приложение, которое отдаёт STATIC_ROOT и MEDIA_ROOT до Django.
+
+    Файлы не проходят через middleware и представления: ответ собирается
+    по os.stat, целиком файлы отдаются через wsgi.file_wrapper (сервер
+    может использовать sendfile), а запросы с Range — частями. Поддержаны
+    условные запросы, заранее сжатые .br/.gz копии статики и вечное
+    кеширование файлов с хешем в имени. Остальные запросы уходят
+    в application.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        for prefix, root in (
+            (settings.STATIC_URL, settings.STATIC_ROOT),
+            (settings.MEDIA_URL, settings.MEDIA_ROOT),
+        ):
+            if root and prefix.startswith('/') and path.startswith(prefix):
+                return self.serve(
+                    environ, start_response, root, path[len(prefix):])
+        return self.application(environ, start_response)
+
+    def serve(self, environ, start_response, root, name):
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [
+                ('Allow', 'GET, HEAD'), ('Content-Length', '0'),
+            ])
+            return []
+        path = resolve(root, name)
+        if path is None:
+            start_response('404 Not Found', [
+                ('Content-Type', 'text/plain; charset=utf-8'),
+                ('Content-Length', '9'),
+            ])
+            return [b'Not Found']
+        headers = [
+            ('Content-Type', content_type(path)),
+            ('Cache-Control', cache_control(path)),
+            ('Accept-Ranges', 'bytes'),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        encoding = None
+        if 'HTTP_RANGE' not in environ:
+            path, encoding = negotiate(
+                path, environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers += [
+            ('ETag', etag),
+            ('Last-Modified', http_date(stat.st_mtime)),
+        ]
+        if not_modified(environ, etag, stat.st_mtime):
+            start_response('304 Not Modified', headers)
+            return []
+        byte_range = requested_range(environ, etag, stat.st_size)
+        if byte_range is not None and not byte_range:
+            start_response('416 Range Not Satisfiable', [
+                ('Content-Range', f'bytes */{stat.st_size}'),
+                ('Content-Length', '0'),
+            ])
+            return []
+        start, length, status = 0, stat.st_size, '200 OK'
+        if byte_range is not None:
+            start, length, status = (
+                byte_range.start, len(byte_range), '206 Partial Content')
+            headers.append((
+                'Content-Range',
+                f'bytes {start}-{byte_range.stop - 1}/{stat.st_size}',
+            ))
+        headers.append(('Content-Length', str(length)))
+        start_response(status, headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file = open(path, 'rb')
+        if length == stat.st_size and 'wsgi.file_wrapper' in environ:
+            return environ['wsgi.file_wrapper'](file, BLOCK_SIZE)
+        file.seek(start)
+        return FileIterator(file, length)
+
+
+def resolve(root, name):
+    """Путь к файлу name внутри root; None, если файла нет или путь
+    выходит за пределы root."""
+    try:
+        # PATH_INFO по PEP 3333 — байты UTF-8, прочитанные как latin1.
+        name = name.encode('latin1').decode('utf-8')
+    except UnicodeError:
+        return None
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+def content_type(path):
+    mimetype, _ = mimetypes.guess_type(path)
+    mimetype = mimetype or 'application/octet-stream'
+    if mimetype.startswith('text/') or mimetype in TEXT_TYPES:
+        mimetype += '; charset=utf-8'
+    return mimetype
+
+
+def cache_control(path):
+    if IMMUTABLE_NAME_RE.search(path.replace(os.sep, '/')):
+        return IMMUTABLE_CACHE_CONTROL
+    return f'public, max-age={settings.FILE_SERVER_MAX_AGE}'
+
+
+def negotiate(path, accept_encoding):
+    """Сжатая копия файла, которую принимает клиент, и её кодировка."""
+    accepted = {
+        value.split(';')[0].strip() for value in accept_encoding.split(',')
+    }
+    for encoding, extension in ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + extension):
+            return path + extension, encoding
+    return path, None
+
+
+def not_modified(environ, etag, mtime):
+    if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return etag in tags or '*' in tags
+    since = parse_http_date_safe(environ.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(mtime) <= since
+
+
+def requested_range(environ, etag, size):
+    """Диапазон из Range, если If-Range не говорит, что файл изменился."""
+    if environ.get('HTTP_IF_RANGE', etag) != etag:
+        return None
+    return parse_range(environ.get('HTTP_RANGE'), size)
+
+
+def parse_range(header, size):
+    """Диапазон байтов из заголовка Range.
+
+    None — заголовка нет или он не поддерживается (например, несколько
+    диапазонов), тогда отдаётся весь файл; пустой range — диапазон
+    за пределами файла.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+        if not int(last):
+            return range(0)
+    if start > end:
+        return range(0)
+    return range(start, end + 1)
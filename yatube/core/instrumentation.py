@@ -0,0 +1,223 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Границы корзин гистограмм: миллисекунды для длительностей и штуки для
+# числа SQL-запросов. Последняя корзина — всё, что больше.
+DURATION_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+METRICS = {
+    'total': DURATION_BUCKETS,
+    'db': DURATION_BUCKETS,
+    'queries': COUNT_BUCKETS,
+    'tpl': DURATION_BUCKETS,
+    'thumb': DURATION_BUCKETS,
+    'generate': DURATION_BUCKETS,
+}
+
+_local = threading.local()
+_lock = threading.Lock()
+_histograms = {}
+_last_flush = time.monotonic()
+_flush_registered = False
+
+
+class Timings:
+    """Замеры одного запроса: время по разделам и число SQL-запросов."""
+
+    def __init__(self):
+        self.durations = {}
+        self.queries = 0
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0) + seconds
+
+
+class Histogram:
+    def __init__(self, bounds, counts=None, total=0, maximum=0):
+        self.bounds = tuple(bounds)
+        self.counts = counts or [0] * (len(self.bounds) + 1)
+        self.total = total
+        self.maximum = maximum
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    def percentile(self, percent):
+        """Верхняя граница корзины, в которую попал перцентиль."""
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.maximum
+
+    def as_dict(self):
+        return {
+            'bounds': list(self.bounds),
+            'counts': self.counts,
+            'total': self.total,
+            'maximum': self.maximum,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['bounds'], data['counts'], data['total'], data['maximum'])
+
+
+def current():
+    """Замеры текущего запроса или None, если он не отслеживается."""
+    return getattr(_local, 'timings', None)
+
+
+def start():
+    _local.timings = Timings()
+    return _local.timings
+
+
+def stop():
+    _local.timings = None
+
+
+@contextmanager
+def timed(name):
+    """Добавляет время выполнения блока к разделу name текущего запроса.
+
+    Вне отслеживаемого запроса (или когда замеры выключены) блок
+    выполняется без часов.
+    """
+    timings = current()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def sql_timer(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper: время и число SQL-запросов."""
+    timings = current()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - started)
+        timings.queries += 1
+
+
+def record(view, metric, value):
+    """Добавляет значение в гистограмму метрики metric страницы view."""
+    with _lock:
+        histogram = _histograms.get((view, metric))
+        if histogram is None:
+            histogram = _histograms[(view, metric)] = Histogram(
+                METRICS.get(metric, DURATION_BUCKETS))
+        histogram.add(value)
+
+
+def record_timings(view, timings, total):
+    record(view, 'total', total * 1000)
+    record(view, 'queries', timings.queries)
+    for name, seconds in timings.durations.items():
+        record(view, name, seconds * 1000)
+    maybe_flush()
+
+
+def snapshot():
+    with _lock:
+        return {
+            key: Histogram.from_dict(histogram.as_dict())
+            for key, histogram in _histograms.items()
+        }
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def dump_path(pid=None):
+    return os.path.join(
+        settings.INSTRUMENTATION_DIR, f'{pid or os.getpid()}.json')
+
+
+def flush():
+    """Сохраняет гистограммы процесса в INSTRUMENTATION_DIR.
+
+    Каждый процесс пишет свой файл, команда instrumentation складывает их.
+    """
+    global _last_flush
+    _last_flush = time.monotonic()
+    data = [
+        {'view': view, 'metric': metric, **histogram.as_dict()}
+        for (view, metric), histogram in snapshot().items()
+    ]
+    if not data:
+        return
+    os.makedirs(settings.INSTRUMENTATION_DIR, exist_ok=True)
+    path = dump_path()
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(path + '.tmp', path)
+
+
+def maybe_flush():
+    interval = settings.INSTRUMENTATION_FLUSH_INTERVAL
+    if time.monotonic() - _last_flush >= interval:
+        flush()
+
+
+def load_dumps():
+    """Складывает гистограммы, сохранённые всеми процессами."""
+    merged = {}
+    pattern = os.path.join(settings.INSTRUMENTATION_DIR, '*.json')
+    for path in glob.glob(pattern):
+        with open(path, encoding='utf-8') as file:
+            for data in json.load(file):
+                key = (data['view'], data['metric'])
+                histogram = Histogram.from_dict(data)
+                if key in merged:
+                    merged[key].merge(histogram)
+                else:
+                    merged[key] = histogram
+    return merged
+
+
+def remove_dumps():
+    pattern = os.path.join(settings.INSTRUMENTATION_DIR, '*.json')
+    for path in glob.glob(pattern):
+        os.remove(path)
+
+
+def register_flush():
+    """Сохраняет гистограммы при выходе из процесса."""
+    global _flush_registered
+    if not _flush_registered:
+        atexit.register(flush)
+        _flush_registered = True
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.instrumentation import load_dumps, remove_dumps
+
+HEADER = (
+    f'{"страница":<28} {"метрика":<9} {"число":>7} {"среднее":>9} '
+    f'{"p50":>7} {"p95":>7} {"p99":>7} {"макс":>9}'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит гистограммы замеров запросов, сохранённые процессами '
+        'сервера в INSTRUMENTATION_DIR. Длительности — в миллисекундах, '
+        'p50/p95/p99 — верхние границы корзин.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести гистограммы целиком в JSON.',
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Удалить сохранённые гистограммы после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        histograms = load_dumps()
+        if options['json']:
+            self.stdout.write(json.dumps(
+                [
+                    {'view': view, 'metric': metric, **histogram.as_dict()}
+                    for (view, metric), histogram in sorted(
+                        histograms.items())
+                ],
+                ensure_ascii=False,
+                indent=2,
+            ))
+        elif not histograms:
+            self.stdout.write('Замеров пока нет.')
+        else:
+            self.stdout.write(HEADER)
+            for (view, metric), histogram in sorted(histograms.items()):
+                self.stdout.write(
+                    f'{view:<28} {metric:<9} {histogram.count:>7} '
+                    f'{histogram.total / histogram.count:>9.1f} '
+                    f'{histogram.percentile(50):>7} '
+                    f'{histogram.percentile(95):>7} '
+                    f'{histogram.percentile(99):>7} '
+                    f'{histogram.maximum:>9.1f}'
+                )
+        if options['reset']:
+            remove_dumps()
+            self.stdout.write(self.style.SUCCESS('Замеры удалены.'))
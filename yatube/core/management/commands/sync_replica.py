@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файл реплики. Нужна для проверки '
+        'чтения с реплики локально, без настоящей репликации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=None,
+            help='Алиас реплики; по умолчанию REPLICA_DATABASE или replica.',
+        )
+
+    def handle(self, *args, **options):
+        alias = options['database'] or settings.REPLICA_DATABASE or 'replica'
+        if alias not in settings.DATABASES or alias == 'default':
+            raise CommandError(f'Неизвестная реплика: {alias}')
+        primary = connections['default']
+        replica = settings.DATABASES[alias]
+        if primary.vendor != 'sqlite' or 'sqlite' not in replica['ENGINE']:
+            raise CommandError('Копирование поддерживается только для SQLite.')
+        connections[alias].close()
+        primary.ensure_connection()
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'База скопирована в {replica["NAME"]}.'))
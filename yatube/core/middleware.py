@@ -0,0 +1,57 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import instrumentation
+
+
+class InstrumentationMiddleware:
+    """Замеряет SQL, рендер шаблонов и миниатюры каждого запроса.
+
+    Результат уходит в заголовок Server-Timing ответа и в гистограммы
+    процесса, которые выводит команда instrumentation. При выключенном
+    INSTRUMENTATION_ENABLED middleware не подключается вовсе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrumentation.register_flush()
+
+    def __call__(self, request):
+        timings = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(
+                        instrumentation.sql_timer))
+                response = self.get_response(request)
+        finally:
+            instrumentation.stop()
+        total = time.perf_counter() - started
+        response['Server-Timing'] = server_timing(timings, total)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        instrumentation.record_timings(view, timings, total)
+        return response
+
+
+def server_timing(timings, total):
+    metrics = [
+        f'db;dur={timings.durations.get("db", 0) * 1000:.1f};'
+        f'desc="SQL, {timings.queries} queries"',
+    ]
+    descriptions = {'tpl': 'Templates', 'thumb': 'Thumbnails'}
+    for name, description in descriptions.items():
+        if name in timings.durations:
+            metrics.append(
+                f'{name};dur={timings.durations[name] * 1000:.1f};'
+                f'desc="{description}"'
+            )
+    metrics.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(metrics)
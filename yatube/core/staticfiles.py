@@ -0,0 +1,53 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.json', '.map', '.txt', '.html', '.xml',
+)
+# Сжатая копия сохраняется, только если она заметно меньше оригинала.
+MIN_RATIO = 0.9
+
+
+def compressors():
+    """Кодировки сжатия, доступные для статики: (расширение, функция)."""
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(
+            data, mode=brotli.MODE_TEXT)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище статики с хешами в именах и заранее сжатыми копиями.
+
+    После collectstatic рядом с каждым текстовым файлом лежат file.gz и,
+    если установлен пакет brotli, file.br; core.fileserver.FileServer
+    отдаёт их клиентам, которые их принимают, не сжимая ничего на лету.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for extension, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) < len(data) * MIN_RATIO:
+                with open(path + extension, 'wb') as target:
+                    target.write(compressed)
+            elif os.path.exists(path + extension):
+                os.remove(path + extension)
@@ -0,0 +1,72 @@
+import logging
+import os
+
+from django.template import (TemplateDoesNotExist, TemplateSyntaxError,
+                             engines)
+from django.template.backends.django import DjangoTemplates, Template
+from django.template.loaders.cached import Loader as CachedLoader
+
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('tpl'):
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Шаблонный движок Django, который замеряет время рендера.
+
+    Замеряются только шаблоны, отрисованные через движок, поэтому
+    вложенные include не считаются дважды.
+    """
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return InstrumentedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+def template_names(engine):
+    """Имена всех шаблонов, которые видят загрузчики движка."""
+    loaders = []
+    for loader in engine.engine.template_loaders:
+        loaders.extend(getattr(loader, 'loaders', [loader]))
+    names = set()
+    for loader in loaders:
+        for directory in loader.get_dirs():
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    names.add(os.path.relpath(path, directory).replace(
+                        os.sep, '/'))
+    return sorted(names)
+
+
+def warm_up_templates():
+    """Заранее компилирует все шаблоны движков с кеширующим загрузчиком.
+
+    Первый запрос к каждой странице иначе читает и разбирает шаблоны
+    сам. Возвращает число скомпилированных шаблонов.
+    """
+    compiled = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates) or not any(
+            isinstance(loader, CachedLoader)
+            for loader in engine.engine.template_loaders
+        ):
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as error:
+                logger.warning('Шаблон %s не скомпилирован: %s', name, error)
+                continue
+            compiled += 1
+    return compiled
@@ -0,0 +1,34 @@
+import asyncio
+
+from core.asgi import join_cookie_headers
+from django.test import SimpleTestCase
+
+
+class JoinCookieHeadersTest(SimpleTestCase):
+    def get_scope(self, headers):
+        received = []
+
+        async def application(scope, receive, send):
+            received.append(scope)
+
+        scope = {'type': 'http', 'headers': headers}
+        asyncio.run(join_cookie_headers(application)(scope, None, None))
+        return received[0]
+
+    def test_split_cookies_are_joined(self):
+        """Отдельные заголовки Cookie от клиентов HTTP/2 склеиваются
+        через '; '."""
+        scope = self.get_scope([
+            (b'host', b'localhost'),
+            (b'cookie', b'sessionid=abc'),
+            (b'cookie', b'csrftoken=def'),
+        ])
+        self.assertEqual(scope['headers'], [
+            (b'host', b'localhost'),
+            (b'cookie', b'sessionid=abc; csrftoken=def'),
+        ])
+
+    def test_single_cookie_is_untouched(self):
+        """Запрос с одним заголовком Cookie не меняется."""
+        headers = [(b'cookie', b'sessionid=abc')]
+        self.assertIs(self.get_scope(headers)['headers'], headers)
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Post, User
+
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRouterTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def get(self, url):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(replica.captured_queries)
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_feeds_read_from_replica(self):
+        """Ленты и страница поста читаются с реплики."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertGreater(self.get(url), 0)
+
+    def test_author_reads_own_writes_from_primary(self):
+        """После записи автор читает из основной базы."""
+        self.client.force_login(self.author)
+        detail = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            self.assertGreater(self.get(detail), 0)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.client.post(
+                reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+                data={'text': 'Комментарий'},
+            )
+        self.assertEqual(len(replica.captured_queries), 0)
+        self.assertEqual(self.get(detail), 0)
+
+    def test_recently_changed_feeds_render_from_primary(self):
+        """Только что изменённые ленты рендерятся из основной базы.
+
+        Реплика могла ещё не получить новый пост, а страница ленты попадает
+        в кеш на FEED_CACHE_TIMEOUT.
+        """
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url), 0)
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            cache.clear()
+            self.assertGreater(self.get(reverse('posts:index')), 0)
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_disabled(self):
+        """Без REPLICA_DATABASE всё читается из основной базы."""
+        self.assertEqual(self.get(reverse('posts:index')), 0)
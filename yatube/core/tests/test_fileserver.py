@@ -0,0 +1,140 @@
+import gzip
+import os
+import shutil
+import tempfile
+from wsgiref.util import FileWrapper
+
+from core.fileserver import IMMUTABLE_CACHE_CONTROL, FileServer
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+CSS = b'body { color: black; }\n' * 200
+
+
+def fallback(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'django']
+
+
+class FileServerTest(SimpleTestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        with open(os.path.join(self.static_root, 'site.css'), 'wb') as file:
+            file.write(CSS)
+        with open(os.path.join(self.static_root, 'site.css.gz'), 'wb') as gz:
+            gz.write(gzip.compress(CSS))
+        self.image_name = 'posts/ab/' + 'ab' * 32 + '.gif'
+        os.makedirs(os.path.join(self.media_root, 'posts', 'ab'))
+        with open(os.path.join(self.media_root, self.image_name), 'wb') as f:
+            f.write(bytes(range(256)))
+        settings_override = override_settings(
+            STATIC_ROOT=self.static_root, MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.application = FileServer(fallback)
+
+    def request(self, path, method='GET', **headers):
+        environ = RequestFactory().generic(method, path, **headers).environ
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = dict(headers)
+
+        result = self.application(environ, start_response)
+        try:
+            body = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], body
+
+    def test_other_paths_reach_django(self):
+        self.assertEqual(self.request('/about/')[2], b'django')
+
+    def test_static_file(self):
+        status, headers, body = self.request('/static/site.css')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, CSS)
+        self.assertEqual(headers['Content-Type'], 'text/css; charset=utf-8')
+        self.assertEqual(headers['Content-Length'], str(len(CSS)))
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertIn('max-age', headers['Cache-Control'])
+
+    def test_precompressed_variant(self):
+        status, headers, body = self.request(
+            '/static/site.css', HTTP_ACCEPT_ENCODING='br, gzip;q=0.9')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), CSS)
+
+    def test_conditional_requests(self):
+        _, headers, _ = self.request('/media/' + self.image_name)
+        self.assertEqual(headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        for name, value in (
+            ('HTTP_IF_NONE_MATCH', headers['ETag']),
+            ('HTTP_IF_MODIFIED_SINCE', headers['Last-Modified']),
+        ):
+            with self.subTest(header=name):
+                status, _, body = self.request(
+                    '/media/' + self.image_name, **{name: value})
+                self.assertEqual(status, 304)
+                self.assertEqual(body, b'')
+
+    def test_ranges(self):
+        path = '/media/' + self.image_name
+        cases = {
+            'bytes=10-19': (206, bytes(range(10, 20)), 'bytes 10-19/256'),
+            'bytes=250-': (206, bytes(range(250, 256)), 'bytes 250-255/256'),
+            'bytes=-3': (206, bytes([253, 254, 255]), 'bytes 253-255/256'),
+            'bytes=300-': (416, b'', 'bytes */256'),
+            'bytes=1-2,5-6': (200, bytes(range(256)), None),
+        }
+        for header, (status, body, content_range) in cases.items():
+            with self.subTest(range=header):
+                response = self.request(path, HTTP_RANGE=header)
+                self.assertEqual(response[0], status)
+                self.assertEqual(response[2], body)
+                self.assertEqual(
+                    response[1].get('Content-Range'), content_range)
+
+    def test_whole_file_uses_file_wrapper(self):
+        environ = RequestFactory().get('/media/' + self.image_name).environ
+        environ['wsgi.file_wrapper'] = FileWrapper
+        result = self.application(environ, lambda status, headers: None)
+        self.assertIsInstance(result, FileWrapper)
+        result.close()
+
+    def test_missing_files_and_traversal(self):
+        for path in ('/static/missing.css', '/static/../manage.py',
+                     '/media/%2e%2e/manage.py'):
+            with self.subTest(path=path):
+                self.assertEqual(self.request(path)[0], 404)
+        self.assertEqual(self.request('/static/site.css', 'POST')[0], 405)
+
+    @override_settings(
+        STATICFILES_STORAGE=(
+            'core.staticfiles.CompressedManifestStaticFilesStorage'),
+        STATICFILES_DIRS=[],
+    )
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        source = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, source, ignore_errors=True)
+        with open(os.path.join(source, 'app.css'), 'wb') as file:
+            file.write(CSS)
+        with override_settings(STATICFILES_DIRS=[source]):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name('app.css')
+        self.assertRegex(hashed, r'^app\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.static_root, hashed + '.gz'), 'rb') as gz:
+            self.assertEqual(gzip.decompress(gz.read()), CSS)
+        status, headers, _ = self.request(
+            '/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
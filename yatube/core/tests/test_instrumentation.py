@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from core import instrumentation
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True, INSTRUMENTATION_DIR=TEMP_DIR)
+class InstrumentationMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        # Иначе гистограммы тестов сохранятся при выходе из процесса.
+        instrumentation.reset()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset()
+
+    def test_server_timing_header(self):
+        """Ответ содержит время SQL, шаблонов и общее время запроса."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="SQL, [1-9]\d* queries"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    def test_histograms_are_dumped(self):
+        """Гистограммы по страницам сохраняются и выводятся командой."""
+        for _ in range(3):
+            self.client.get(reverse('posts:index'))
+        histograms = instrumentation.snapshot()
+        self.assertEqual(histograms[('posts:index', 'total')].count, 3)
+        instrumentation.flush()
+        out = StringIO()
+        call_command('instrumentation', '--reset', stdout=out)
+        self.assertIn('posts:index', out.getvalue())
+        self.assertEqual(instrumentation.load_dumps(), {})
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        """Выключенные замеры не добавляют заголовок и не копят данные."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(instrumentation.snapshot(), {})
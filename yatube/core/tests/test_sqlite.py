@@ -0,0 +1,31 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Настройки соединения SQLite')
+class SqlitePragmasTest(SimpleTestCase):
+    databases = {'default'}
+
+    def pragma(self, new_connection, name):
+        with new_connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={
+        'synchronous': 'normal',
+        'busy_timeout': 1234,
+        'cache_size': -2048,
+    })
+    def test_pragmas_applied_to_new_connections(self):
+        """Новое соединение получает настройки из SQLITE_PRAGMAS."""
+        new_connection = connection.copy()
+        try:
+            self.assertEqual(self.pragma(new_connection, 'synchronous'), 1)
+            self.assertEqual(
+                self.pragma(new_connection, 'busy_timeout'), 1234)
+            self.assertEqual(
+                self.pragma(new_connection, 'cache_size'), -2048)
+        finally:
+            new_connection.close()
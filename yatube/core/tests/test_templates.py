@@ -0,0 +1,24 @@
+from core.template_backend import warm_up_templates
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+from posts.benchmark import templates_setting
+
+
+class TemplateWarmUpTest(SimpleTestCase):
+    @override_settings(TEMPLATES=templates_setting(cached=True))
+    def test_warm_up_fills_cached_loader(self):
+        """Прогрев компилирует шаблоны в кеш загрузчика."""
+        self.assertGreater(warm_up_templates(), 0)
+        loader = engines.all()[0].engine.template_loaders[0]
+        cached = {
+            template.origin.template_name
+            for template in loader.get_template_cache.values()
+            if hasattr(template, 'origin')
+        }
+        for name in ('posts/index.html', 'includes/header.html'):
+            self.assertIn(name, cached)
+
+    @override_settings(TEMPLATES=templates_setting(cached=False))
+    def test_warm_up_skips_uncached_engines(self):
+        """Без кеширующего загрузчика прогревать нечего."""
+        self.assertEqual(warm_up_templates(), 0)
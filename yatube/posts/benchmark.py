@@ -0,0 +1,349 @@
+import multiprocessing
+import platform
+import statistics
+import time
+from collections import Counter
+from importlib import import_module
+
+import django
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, connections
+from django.middleware.csrf import get_token
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from .counters import rebuild_counters
+from .models import Comment, Group, Post, User
+from .search import rebuild_index, search_available
+
+ROUTES = (
+    'index',
+    'group_posts',
+    'profile',
+    'post_detail',
+    'post_create',
+    'add_comment',
+)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+# Хост из ALLOWED_HOSTS: запросы идут через боевое WSGI-приложение,
+# а не через тестовый клиент.
+SERVER_NAME = 'localhost'
+
+
+def seed(users=10, groups=5, posts=1000, comments=5000, images=100):
+    """Заполняет базу набором данных для замера.
+
+    Данные вставляются через bulk_create, поэтому сигналы не срабатывают:
+    счётчики и поисковый индекс пересчитываются в конце.
+    """
+    User.objects.bulk_create(
+        User(username=f'bench-user-{i}') for i in range(users)
+    )
+    authors = list(User.objects.filter(username__startswith='bench-user-'))
+    Group.objects.bulk_create(
+        Group(
+            title=f'Группа {i}',
+            slug=f'bench-group-{i}',
+            description=f'Описание группы {i}',
+        ) for i in range(groups)
+    )
+    group_list = list(Group.objects.filter(slug__startswith='bench-group-'))
+    image_names = [
+        default_storage.save(f'posts/bench-{i}.gif', ContentFile(SMALL_GIF))
+        for i in range(images)
+    ]
+    Post.objects.bulk_create(
+        (
+            Post(
+                text=f'Тестовый пост номер {i}',
+                author=authors[i % len(authors)],
+                group=group_list[i % len(group_list)] if group_list else None,
+                image=image_names[i] if i < len(image_names) else '',
+                image_width=2 if i < len(image_names) else None,
+                image_height=1 if i < len(image_names) else None,
+            ) for i in range(posts)
+        ),
+        batch_size=500,
+    )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    if post_ids:
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post_id=post_ids[i % len(post_ids)],
+                    author=authors[i % len(authors)],
+                    text=f'Комментарий {i}',
+                ) for i in range(comments)
+            ),
+            batch_size=500,
+        )
+    rebuild_counters()
+    if search_available():
+        rebuild_index()
+    return authors[0]
+
+
+class WSGIBench:
+    """Гоняет запросы через WSGI-приложение из yatube/wsgi.py.
+
+    Запросы собираются RequestFactory, поэтому проходят весь стек
+    промежуточных слоёв, включая сессии и проверку CSRF.
+    """
+
+    def __init__(self, user=None):
+        from yatube.wsgi import application
+        self.application = application
+        self.factory = RequestFactory(SERVER_NAME=SERVER_NAME)
+        self.extra = {}
+        if user is not None:
+            self.login(user)
+
+    def login(self, user):
+        engine = import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        request = self.factory.get('/')
+        self.extra['HTTP_X_CSRFTOKEN'] = get_token(request)
+        self.factory.cookies[settings.SESSION_COOKIE_NAME] = (
+            session.session_key)
+        self.factory.cookies[settings.CSRF_COOKIE_NAME] = (
+            request.META['CSRF_COOKIE'])
+
+    def request(self, method, path, data=None):
+        request = getattr(self.factory, method)(path, data, **self.extra)
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split()[0]))
+
+        response = self.application(request.environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return status[0]
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(rank)]
+
+
+def measure(bench, method, path, data=None, requests=100, warmup=1):
+    for _ in range(warmup):
+        bench.request(method, path, data)
+    timings = []
+    queries = []
+    statuses = Counter()
+    started = time.perf_counter()
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as context:
+            request_started = time.perf_counter()
+            statuses[bench.request(method, path, data)] += 1
+            timings.append(time.perf_counter() - request_started)
+        queries.append(len(context.captured_queries))
+    total = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'requests_per_second': round(requests / total, 2),
+        'latency_ms': {
+            'mean': round(statistics.mean(timings) * 1000, 3),
+            'p50': round(percentile(timings, 50) * 1000, 3),
+            'p99': round(percentile(timings, 99) * 1000, 3),
+        },
+        'queries': {
+            'min': min(queries),
+            'median': statistics.median(queries),
+            'max': max(queries),
+        },
+        'statuses': {str(code): count for code, count in statuses.items()},
+    }
+
+
+def route_plans(user, reader, author):
+    """Запросы к маршрутам: кто, каким методом, куда и с какими данными."""
+    post = user.posts.order_by('-pub_date', '-id').first()
+    return {
+        'index': (reader, 'get', reverse('posts:index'), None),
+        'group_posts': (
+            reader, 'get',
+            reverse('posts:group_list', kwargs={'slug': post.group.slug}),
+            None,
+        ),
+        'profile': (
+            reader, 'get',
+            reverse('posts:profile', kwargs={'username': user.username}),
+            None,
+        ),
+        'post_detail': (
+            reader, 'get',
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            None,
+        ),
+        'post_create': (
+            author, 'post', reverse('posts:post_create'),
+            {'text': 'Пост из замера', 'group': post.group_id},
+        ),
+        'add_comment': (
+            author, 'post',
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'Комментарий из замера'},
+        ),
+    }
+
+
+def run_benchmark(user, routes=ROUTES, requests=100, warmup=1,
+                  cached=False):
+    """Замеряет маршруты posts.urls и возвращает результаты по каждому.
+
+    По умолчанию ленты читает вошедший пользователь: cache_feed кеширует
+    только анонимные страницы, поэтому каждый запрос рендерится и число
+    запросов к БД — это запросы самого представления. С cached=True
+    ленты читает анонимный пользователь и в замер попадает кеш лент
+    (после прогрева у лент 0 запросов). Пост и комментарий создаёт
+    пользователь user.
+    """
+    reader = WSGIBench() if cached else WSGIBench(user)
+    plans = route_plans(user, reader, WSGIBench(user))
+    cache.clear()
+    results = {}
+    for name in routes:
+        bench, method, path, data = plans[name]
+        results[name] = measure(
+            bench, method, path, data, requests=requests, warmup=warmup)
+    return results
+
+
+def templates_setting(cached):
+    """TEMPLATES с кеширующим загрузчиком шаблонов или без него."""
+    templates = []
+    for engine in settings.TEMPLATES:
+        engine = dict(engine, OPTIONS=dict(engine.get('OPTIONS', {})))
+        loaders = settings.TEMPLATE_LOADERS
+        engine['OPTIONS']['loaders'] = (
+            [('django.template.loaders.cached.Loader', loaders)]
+            if cached else loaders
+        )
+        templates.append(engine)
+    return templates
+
+
+def run_template_benchmark(user, requests=100):
+    """Сравнивает рендер страниц лент без кеша шаблонов и с ним.
+
+    Страницы запрашивает вошедший пользователь, чтобы кеш лент не
+    скрывал рендер. Кеширующий загрузчик прогревается так же, как при
+    запуске сервера.
+    """
+    from core.template_backend import warm_up_templates
+
+    results = {}
+    for name, cached in (('uncached', False), ('cached', True)):
+        with override_settings(TEMPLATES=templates_setting(cached)):
+            if cached:
+                warm_up_templates()
+            reader = WSGIBench(user)
+            plans = route_plans(user, reader, reader)
+            results[name] = {
+                route: measure(*plans[route][:3], requests=requests, warmup=0)
+                for route in ('index', 'group_posts', 'profile', 'post_detail')
+            }
+    return results
+
+
+def _contention_worker(role, user, paths, seconds, results):
+    connections.close_all()
+    bench = WSGIBench(user if role == 'writer' else None)
+    timings = []
+    counts = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        if role == 'writer':
+            status = bench.request(
+                'post', paths['comment'], {'text': 'Запись'})
+            counts['writes' if status == 302 else 'write_errors'] += 1
+        else:
+            status = bench.request('get', paths['detail'])
+            counts['reads' if status == 200 else 'read_errors'] += 1
+            timings.append(time.perf_counter() - started)
+    connections.close_all()
+    results.put((counts, timings))
+
+
+def run_contention(user, seconds=2.0, readers=4):
+    """Замеряет чтение страницы поста, пока другой процесс пишет
+    комментарии.
+
+    Читатели и писатель — отдельные процессы со своими соединениями, как
+    воркеры сервера. Ошибкой считается любой ответ, кроме ожидаемого,
+    например 500 из-за «database is locked».
+    """
+    post = user.posts.order_by('-pub_date', '-id').first()
+    paths = {
+        'detail': reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        'comment': reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+    }
+    # Соединения нельзя наследовать дочерним процессам.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=_contention_worker,
+            args=(role, user, paths, seconds, results),
+        ) for role in ['writer'] + ['reader'] * readers
+    ]
+    for worker in workers:
+        worker.start()
+    counts = Counter()
+    timings = []
+    for _ in workers:
+        worker_counts, worker_timings = results.get()
+        counts.update(worker_counts)
+        timings.extend(worker_timings)
+    for worker in workers:
+        worker.join()
+    return {
+        'readers': readers,
+        'reads_per_second': round(counts['reads'] / seconds, 2),
+        'read_errors': counts['read_errors'],
+        'writes_per_second': round(counts['writes'] / seconds, 2),
+        'write_errors': counts['write_errors'],
+        'read_latency_ms': {
+            'p50': round(percentile(timings, 50) * 1000, 3),
+            'p99': round(percentile(timings, 99) * 1000, 3),
+            'max': round(max(timings) * 1000, 3),
+        },
+    }
+
+
+def environment():
+    """Сведения об окружении, которые кладутся рядом с результатами."""
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'cache': settings.CACHES['default']['BACKEND'],
+    }
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+INDEX_POSTS_KEY = 'counters:index_posts'
+
+
+def _change(queryset, field, delta):
+    return queryset.update(**{field: F(field) + delta})
+
+
+def _change_author(user_id, field, delta):
+    updated = _change(
+        AuthorStats.objects.filter(user_id=user_id), field, delta
+    )
+    if updated or delta <= 0:
+        return
+    # Строки ещё нет. Её могут одновременно создавать из другого запроса:
+    # get_or_create тогда получит IntegrityError, найдёт созданную строку,
+    # и изменение применится к ней.
+    stats, created = AuthorStats.objects.get_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id
+            ).count(),
+        },
+    )
+    if not created:
+        _change(AuthorStats.objects.filter(pk=stats.pk), field, delta)
+
+
+def change_author_posts(user_id, delta):
+    _change_author(user_id, 'posts_count', delta)
+
+
+def change_author_followers(user_id, delta):
+    _change_author(user_id, 'followers_count', delta)
+
+
+def change_group_posts(group_id, delta):
+    _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def index_posts_count():
+    """Число всех постов из кеша.
+
+    Значение пересчитывается через COUNT(*) раз в FEED_COUNT_TIMEOUT
+    секунд, а между пересчётами меняется вместе с созданием и удалением
+    постов.
+    """
+    return cache.get_or_set(
+        INDEX_POSTS_KEY, Post.objects.count, settings.FEED_COUNT_TIMEOUT
+    )
+
+
+def change_index_posts(delta):
+    def change():
+        try:
+            cache.incr(INDEX_POSTS_KEY, delta)
+        except ValueError:
+            # Значения нет в кеше: его посчитает следующее чтение.
+            pass
+    transaction.on_commit(change)
+
+
+def _count_subquery(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def rebuild_counters():
+    """Пересчитывает все счётчики по фактическим данным."""
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk) for pk in User.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True)]
+    )
+    AuthorStats.objects.update(
+        posts_count=_count_subquery(Post, 'author', outer='user'),
+        followers_count=_count_subquery(Follow, 'author', outer='user'),
+    )
+    Group.objects.update(posts_count=_count_subquery(Post, 'group'))
+    Post.objects.update(comments_count=_count_subquery(Comment, 'post'))
+    cache.delete(INDEX_POSTS_KEY)
@@ -0,0 +1,147 @@
+import csv
+import datetime
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Post
+
+FORMATS = ('jsonl', 'csv')
+KINDS = ('posts', 'comments')
+CHUNK_SIZE = 2000
+
+# Поля выгрузки: имя в файле и путь для values_list.
+FIELDS = {
+    'posts': (
+        ('id', 'pk'),
+        ('pub_date', 'pub_date'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('text', 'text'),
+        ('image', 'image'),
+        ('comments_count', 'comments_count'),
+    ),
+    'comments': (
+        ('id', 'pk'),
+        ('post', 'post_id'),
+        ('created', 'created'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+    ),
+}
+DATE_FIELDS = {'posts': 'pub_date', 'comments': 'created'}
+
+
+def parse_moment(value, end=False):
+    """Дата или дата-время границы выгрузки.
+
+    Для даты без времени граница end указывает на начало следующего дня,
+    чтобы --until 2020-01-31 включал весь день.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        if end:
+            day += datetime.timedelta(days=1)
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(kind, since=None, until=None, author=None, group=None):
+    """Запрос строк выгрузки постов или комментариев в порядке id.
+
+    Даты разбираются сразу, поэтому ошибка в фильтре видна до начала
+    выгрузки.
+    """
+    model = Post if kind == 'posts' else Comment
+    date_field = DATE_FIELDS[kind]
+    prefix = '' if kind == 'posts' else 'post__'
+    queryset = model.objects.order_by('pk')
+    if since:
+        queryset = queryset.filter(
+            **{f'{date_field}__gte': parse_moment(since)})
+    if until:
+        queryset = queryset.filter(
+            **{f'{date_field}__lt': parse_moment(until, end=True)})
+    if author:
+        queryset = queryset.filter(author__username=author)
+    if group:
+        queryset = queryset.filter(**{f'{prefix}group__slug': group})
+    return queryset.values_list(*(path for _, path in FIELDS[kind]))
+
+
+def export_rows(kind, queryset, chunk_size=CHUNK_SIZE):
+    """Читает строки курсором порциями по chunk_size, не загружая всю
+    таблицу в память."""
+    names = [name for name, _ in FIELDS[kind]]
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield dict(zip(names, row))
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False)
+        yield '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(kind, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in FIELDS[kind]])
+    for row in rows:
+        yield writer.writerow(
+            '' if value is None else value for value in row.values()
+        )
+
+
+def gzip_chunks(chunks):
+    """Сжимает поток байтов в gzip по мере поступления."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(kind, format='jsonl', compress=False, chunk_size=CHUNK_SIZE,
+           **filters):
+    """Поток байтов выгрузки в формате format, при compress — в gzip.
+
+    Мелкие строки собираются в куски около 64 КБ, чтобы не отдавать
+    клиенту и gzip по одной строке.
+    """
+    rows = export_rows(
+        kind, export_queryset(kind, **filters), chunk_size=chunk_size)
+    lines = csv_lines(kind, rows) if format == 'csv' else jsonl_lines(rows)
+    chunks = _buffered(line.encode() for line in lines)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def _buffered(chunks, size=64 * 1024):
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def export_filename(kind, format, compress=False):
+    return f'{kind}.{format}' + ('.gz' if compress else '')
@@ -0,0 +1,201 @@
+import datetime
+import hashlib
+import time
+from functools import wraps
+
+from core.db_router import primary_reads
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+
+INDEX_FEED = 'index'
+
+
+def group_feed(slug):
+    return f'group:{slug}'
+
+
+def profile_feed(username):
+    return f'profile:{username}'
+
+
+def post_page(post_id):
+    return f'post:{post_id}'
+
+
+def post_feeds(post):
+    """Все ленты и страницы, на которых виден пост."""
+    feeds = [
+        INDEX_FEED, profile_feed(post.author.username), post_page(post.pk)
+    ]
+    if post.group_id is not None:
+        feeds.append(group_feed(post.group.slug))
+    return feeds
+
+
+def _version_key(feed):
+    return f'feed-version:{feed}'
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def get_feed_version(feed):
+    """Версия ленты — время её последнего изменения в микросекундах.
+
+    Если версия вытеснена из кеша, новой становится текущее время: оно
+    больше любой прошлой версии, поэтому старые страницы не оживут.
+    """
+    return cache.get_or_set(_version_key(feed), _now, None)
+
+
+def invalidate_feeds(*feeds):
+    """Сдвигает версию ленты: все закешированные страницы становятся
+    недоступны, без перебора ключей отдельных страниц.
+
+    Внутри транзакции версии сдвигаются только после коммита. Иначе
+    запрос, пришедший до коммита, увидел бы старые строки и положил бы
+    старую страницу в кеш уже под новой версией.
+    """
+    transaction.on_commit(lambda: _bump_versions(feeds))
+
+
+def _bump_versions(feeds):
+    now = _now()
+    for feed in feeds:
+        key = _version_key(feed)
+        if cache.add(key, now, None):
+            continue
+        try:
+            # На общем сервере кеша, обязательном в боевом режиме, incr
+            # атомарен, поэтому версия строго растёт даже при одновременных
+            # изменениях и остаётся не меньше времени изменения. Файловый
+            # кеш разработки этого не гарантирует.
+            cache.incr(key, max(1, now - cache.get(key, now)))
+        except ValueError:
+            # Ключ успели вытеснить между add и incr.
+            cache.set(key, now, None)
+
+
+def recently_changed(versions):
+    """Менялась ли какая-то из лент за последние REPLICA_STICKY_SECONDS.
+
+    Реплика могла ещё не получить такие изменения, поэтому страницу
+    рендерят из основной базы: иначе устаревший рендер с реплики попал бы
+    в кеш и в ETag уже под новой версией.
+    """
+    return bool(versions) and (
+        _now() - max(versions) < settings.REPLICA_STICKY_SECONDS * 1000000)
+
+
+def _render(view, versions, request, *args, **kwargs):
+    if recently_changed(versions):
+        with primary_reads():
+            return view(request, *args, **kwargs)
+    return view(request, *args, **kwargs)
+
+
+def requested_page(request):
+    """Страница ленты, которую просит запрос.
+
+    Учитываются только параметры пагинации: остальные не меняют страницу,
+    и иначе запросы со случайными параметрами заполняли бы кеш копиями.
+    """
+    if 'after' in request.GET:
+        return {'after': request.GET['after']}
+    return {'page': request.GET.get('page') or '1'}
+
+
+def set_rendered_page(request, page_obj):
+    """Запоминает, какую страницу на самом деле отдала пагинация.
+
+    Несуществующий номер страницы или битый курсор отдают другую
+    страницу, и такие запросы в кеш не кладутся, чтобы подбором
+    параметров нельзя было создавать новые записи.
+    """
+    if page_obj.number is None:
+        request._feed_page = {'after': page_obj.cursor or ''}
+    else:
+        request._feed_page = {'page': str(page_obj.number)}
+
+
+def feed_page_key(feed, version, page):
+    query = hashlib.md5(urlencode(page).encode()).hexdigest()
+    return f'feed-page:{feed}:{version}:{query}'
+
+
+def cache_feed(get_feed):
+    """Кеширует страницы ленты для анонимных пользователей.
+
+    get_feed получает аргументы представления и возвращает имя ленты,
+    по которому сигналы модели Post сбрасывают её кеш.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            feed = get_feed(*args, **kwargs)
+            version = get_feed_version(feed)
+            page = requested_page(request)
+            key = feed_page_key(feed, version, page)
+            content = cache.get(key)
+            if content is not None:
+                return HttpResponse(content)
+            response = _render(view, [version], request, *args, **kwargs)
+            if (response.status_code == 200
+                    and getattr(request, '_feed_page', None) == page):
+                cache.set(key, response.content, settings.FEED_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_feed(get_feeds):
+    """Отвечает 304 Not Modified, если страница не менялась.
+
+    get_feeds получает аргументы представления и возвращает имена лент,
+    от которых зависит страница, или None, если страницы нет. ETag и
+    Last-Modified строятся из версий этих лент без рендера и обычно без
+    запросов к БД. ETag учитывает пользователя, потому что страницы
+    вошедших пользователей отличаются от анонимных. Недавно изменённые
+    страницы рендерятся из основной базы, см. recently_changed.
+    """
+    def versions(request, *args, **kwargs):
+        if not hasattr(request, '_feed_versions'):
+            feeds = get_feeds(*args, **kwargs)
+            request._feed_versions = feeds and [
+                get_feed_version(feed) for feed in feeds
+            ]
+        return request._feed_versions
+
+    def etag(request, *args, **kwargs):
+        feed_versions = versions(request, *args, **kwargs)
+        if not feed_versions:
+            return None
+        user = request.user.pk if request.user.is_authenticated else 0
+        state = f'{feed_versions}:{user}:{request.GET.urlencode()}'
+        return hashlib.md5(state.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        feed_versions = versions(request, *args, **kwargs)
+        if not feed_versions:
+            return None
+        return datetime.datetime.fromtimestamp(
+            max(feed_versions) / 1000000, tz=datetime.timezone.utc)
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return _render(
+                conditional_view, versions(request, *args, **kwargs),
+                request, *args, **kwargs)
+        return wrapper
+    return decorator
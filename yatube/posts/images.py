@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.images import ImageFile
+from PIL import Image, ImageOps, ImageSequence
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+# Ошибки, с которыми Pillow не может прочитать файл: не картинка, битые
+# данные или слишком много пикселей (защита от декомпрессионных бомб).
+DECODE_ERRORS = (
+    OSError, SyntaxError, ValueError, Image.DecompressionBombError,
+)
+
+
+def _save_options(format):
+    options = {'quality': settings.POST_IMAGE_QUALITY}
+    if format == 'JPEG':
+        options.update(progressive=True, optimize=True)
+    elif format == 'WEBP':
+        options['method'] = 4
+    return options
+
+
+def process_image(content):
+    """Готовит загруженную картинку поста к сохранению.
+
+    Картинка уменьшается до POST_IMAGE_MAX_SIZE, поворачивается по EXIF и
+    перекодируется в POST_IMAGE_FORMAT с качеством POST_IMAGE_QUALITY;
+    метаданные оригинала не сохраняются. Результат пишется во временный
+    файл, который уходит на диск, если больше FILE_UPLOAD_MAX_MEMORY_SIZE.
+    Анимации сохраняют свой формат и все кадры; уменьшаются только те,
+    что больше POST_IMAGE_MAX_SIZE.
+    """
+    format = settings.POST_IMAGE_FORMAT
+    content.seek(0)
+    with Image.open(content) as image:
+        if getattr(image, 'is_animated', False):
+            return _process_animation(image, content)
+        # JPEG умеет декодироваться сразу в уменьшенном виде.
+        image.draft('RGB', settings.POST_IMAGE_MAX_SIZE)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(settings.POST_IMAGE_MAX_SIZE, Image.LANCZOS)
+        has_alpha = image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info)
+        mode = 'RGBA' if has_alpha and format != 'JPEG' else 'RGB'
+        if image.mode != mode:
+            image = image.convert(mode)
+        output = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        image.save(output, format, **_save_options(format))
+    output.seek(0)
+    stem = os.path.splitext(os.path.basename(content.name))[0]
+    return ImageFile(output, name=f'{stem}.{EXTENSIONS[format]}')
+
+
+def _process_animation(image, content):
+    max_width, max_height = settings.POST_IMAGE_MAX_SIZE
+    if image.width <= max_width and image.height <= max_height:
+        content.seek(0)
+        return ImageFile(content, name=os.path.basename(content.name))
+    frames = []
+    durations = []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', image.info.get(
+            'duration', 100)))
+        frame = frame.convert('RGBA')
+        frame.thumbnail(settings.POST_IMAGE_MAX_SIZE, Image.LANCZOS)
+        frames.append(frame)
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    frames[0].save(
+        output, image.format, save_all=True, append_images=frames[1:],
+        duration=durations, loop=image.info.get('loop', 0),
+    )
+    output.seek(0)
+    return ImageFile(output, name=os.path.basename(content.name))
@@ -0,0 +1,294 @@
+import csv
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .counters import (change_author_posts, change_group_posts,
+                       change_index_posts)
+from .feed_cache import INDEX_FEED, group_feed, invalidate_feeds, profile_feed
+from .images import DECODE_ERRORS, process_image
+from .models import Group, Post, User
+from .search import index_posts, search_available
+from .thumbnails import release_unsaved_images, unclaim_images
+from .timelines import fan_out_posts
+
+FORMATS = ('jsonl', 'csv')
+RECORD_FIELDS = ('text', 'author', 'group', 'pub_date', 'image')
+
+
+def read_records(stream, format):
+    """Построчно читает записи постов из JSONL или CSV.
+
+    Каждая запись — словарь с ключами text, author (username) и
+    необязательными group (slug), pub_date (ISO 8601) и image (путь
+    к файлу картинки). Вместо записи, которую не удалось разобрать,
+    возвращается None, чтобы одна битая строка не прерывала импорт.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        while True:
+            try:
+                yield next(reader)
+            except StopIteration:
+                return
+            except csv.Error:
+                yield None
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def is_valid_record(record):
+    """Запись — словарь, а её поля — строки или пусты."""
+    return isinstance(record, dict) and all(
+        isinstance(record.get(key), (str, type(None)))
+        for key in RECORD_FIELDS
+    )
+
+
+def parse_pub_date(value):
+    """Дата публикации из записи: сейчас, если её нет, None, если она
+    не разбирается."""
+    if not value:
+        return timezone.now()
+    try:
+        pub_date = parse_datetime(value)
+    except ValueError:
+        return None
+    if pub_date is not None and timezone.is_naive(pub_date):
+        pub_date = timezone.make_aware(pub_date)
+    return pub_date
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.skipped = Counter()
+        self.images = 0
+        self.started = time.monotonic()
+
+    @property
+    def seconds(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.imported / self.seconds if self.seconds else 0
+
+
+class PostImporter:
+    """Массовая загрузка постов.
+
+    Записи обрабатываются порциями по transaction_size: в каждой порции
+    авторы и группы ищутся одним запросом на порцию и запоминаются,
+    картинки копируются в хранилище пулом потоков, а посты вставляются
+    через bulk_create пачками по batch_size в одной транзакции.
+
+    bulk_create не отправляет сигналы, поэтому счётчики, поисковый
+    индекс, ленты подписок и кеш лент обновляются здесь же.
+    """
+
+    def __init__(self, batch_size=1000, transaction_size=10000,
+                 images_dir='', workers=4, create_authors=False,
+                 progress=None):
+        self.batch_size = batch_size
+        self.transaction_size = transaction_size
+        self.images_dir = images_dir
+        self.workers = workers
+        self.create_authors = create_authors
+        self.progress = progress
+        self.authors = {}
+        self.groups = {}
+        self.stats = ImportStats()
+
+    def run(self, records):
+        records = iter(records)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                chunk = list(islice(records, self.transaction_size))
+                if not chunk:
+                    break
+                self.stats.read += len(chunk)
+                self.import_chunk(chunk, executor)
+                if self.progress:
+                    self.progress(self.stats)
+        return self.stats
+
+    def import_chunk(self, chunk, executor):
+        records = [record for record in chunk if is_valid_record(record)]
+        if len(records) < len(chunk):
+            self.stats.skipped['неверная запись'] += len(chunk) - len(records)
+        chunk = records
+        self.resolve_authors({record.get('author') for record in chunk})
+        self.resolve_groups({record.get('group') for record in chunk})
+        rows = [
+            fields for fields in map(self.post_fields, chunk)
+            if fields is not None
+        ]
+        if not rows:
+            return
+        images = executor.map(
+            self.copy_image, [fields.pop('image') for fields in rows]
+        )
+        posts = []
+        for fields, image in zip(rows, images):
+            if image is None:
+                self.stats.skipped['картинка не найдена или повреждена'] += 1
+                continue
+            # Пост создаётся с уже известными размерами картинки, иначе
+            # ImageField открыл бы файл, чтобы их узнать.
+            name, width, height = image
+            posts.append(Post(
+                image=name, image_width=width, image_height=height, **fields
+            ))
+        if not posts:
+            return
+        self.stats.images += sum(1 for post in posts if post.image)
+        images = [post.image.name for post in posts]
+        try:
+            with transaction.atomic():
+                self.insert(posts)
+                unclaim_images(images)
+                # Версии лент сдвигаются после коммита каждой порции: если
+                # упадёт следующая, уже загруженные посты не останутся
+                # за старыми страницами в кеше.
+                invalidate_feeds(INDEX_FEED, *self.chunk_feeds(posts))
+        except Exception:
+            # Порция откатилась: скопированные для неё картинки не нужны,
+            # если на них не ссылаются другие посты.
+            release_unsaved_images(images)
+            raise
+        self.stats.imported += len(posts)
+
+    def insert(self, posts):
+        # auto_now_add у pub_date перезаписывает даты при вставке, поэтому
+        # даты из записей возвращаются отдельным обновлением в той же
+        # транзакции.
+        pub_dates = [post.pub_date for post in posts]
+        Post.objects.bulk_create(posts, batch_size=self.batch_size)
+        if posts[0].pk is None:
+            # SQLite не возвращает id из bulk_create. До конца транзакции
+            # писать в базу может только она, поэтому последние строки
+            # таблицы — это только что вставленные посты, в том же порядке.
+            ids = list(Post.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(posts)])
+            for post, pk in zip(posts, reversed(ids)):
+                post.pk = pk
+        for post, pub_date in zip(posts, pub_dates):
+            post.pub_date = pub_date
+        Post.objects.bulk_update(
+            posts, ['pub_date'], batch_size=self.batch_size
+        )
+        change_index_posts(len(posts))
+        for author_id, count in Counter(
+            post.author_id for post in posts
+        ).items():
+            change_author_posts(author_id, count)
+        for group_id, count in Counter(
+            post.group_id for post in posts if post.group_id
+        ).items():
+            change_group_posts(group_id, count)
+        if search_available():
+            index_posts(posts)
+        fan_out_posts(posts)
+
+    def resolve_authors(self, usernames):
+        missing = {name for name in usernames if name} - self.authors.keys()
+        if not missing:
+            return
+        self.authors.update(User.objects.filter(
+            username__in=missing
+        ).values_list('username', 'pk'))
+        missing -= self.authors.keys()
+        if missing and self.create_authors:
+            User.objects.bulk_create(
+                [User(username=name) for name in missing],
+                batch_size=self.batch_size,
+            )
+            self.authors.update(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk'))
+
+    def resolve_groups(self, slugs):
+        missing = {slug for slug in slugs if slug} - self.groups.keys()
+        if missing:
+            self.groups.update(Group.objects.filter(
+                slug__in=missing
+            ).values_list('slug', 'pk'))
+
+    def post_fields(self, record):
+        """Поля поста из записи и путь к картинке под ключом image;
+        None, если запись не годится."""
+        text = (record.get('text') or '').strip()
+        author_id = self.authors.get(record.get('author'))
+        slug = record.get('group') or None
+        group_id = self.groups.get(slug)
+        pub_date = parse_pub_date(record.get('pub_date'))
+        if not text:
+            reason = 'нет текста'
+        elif author_id is None:
+            reason = 'неизвестный автор'
+        elif slug is not None and group_id is None:
+            reason = 'неизвестная группа'
+        elif pub_date is None:
+            reason = 'неверная дата'
+        else:
+            return {
+                'text': text,
+                'author_id': author_id,
+                'group_id': group_id,
+                'pub_date': pub_date,
+                'image': record.get('image') or '',
+            }
+        self.stats.skipped[reason] += 1
+        return None
+
+    def copy_image(self, path):
+        """Обрабатывает картинку как загрузку через форму и сохраняет в
+        хранилище.
+
+        Возвращает имя файла, ширину и высоту; None, если файла нет или
+        Pillow не может его прочитать.
+        """
+        if not path:
+            return '', None, None
+        source = os.path.join(self.images_dir, str(path))
+        field = Post._meta.get_field('image')
+        try:
+            with open(source, 'rb') as image:
+                processed = process_image(File(image))
+                with processed:
+                    width, height = processed.width, processed.height
+                    name = field.storage.save(
+                        os.path.join(field.upload_to, processed.name),
+                        processed,
+                    )
+                    return name, width, height
+        except DECODE_ERRORS:
+            return None
+
+    def chunk_feeds(self, posts):
+        author_ids = {post.author_id for post in posts}
+        group_ids = {post.group_id for post in posts}
+        return {
+            profile_feed(name) for name, pk in self.authors.items()
+            if pk in author_ids
+        } | {
+            group_feed(slug) for slug, pk in self.groups.items()
+            if pk in group_ids
+        }
@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import (
+    override_settings, setup_databases, teardown_databases
+)
+
+from posts.benchmark import (
+    ROUTES, environment, run_benchmark, run_contention, run_template_benchmark,
+    seed
+)
+
+# Исходные настройки SQLite для сравнения с SQLITE_PRODUCTION_PRAGMAS.
+BASELINE_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет запросы в секунду, задержки p50/p99 и число запросов к БД '
+        'для маршрутов posts.urls на отдельной тестовой базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--images', type=int, default=100)
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Число замеряемых запросов к каждому маршруту.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=1,
+            help='Число прогревочных запросов, не попадающих в замер.',
+        )
+        parser.add_argument(
+            '--route', action='append', choices=ROUTES, dest='routes',
+            help='Замерить только этот маршрут; можно указать несколько раз.',
+        )
+        parser.add_argument(
+            '--cached', action='store_true',
+            help=(
+                'Читать ленты анонимно, из кеша лент. По умолчанию их '
+                'читает вошедший пользователь, и каждая страница '
+                'рендерится заново.'
+            ),
+        )
+        parser.add_argument(
+            '--contention', type=float, metavar='SECONDS',
+            help=(
+                'Дополнительно замерить чтение страницы поста во время '
+                'записи комментариев: сначала с исходными настройками '
+                'SQLite, затем с SQLITE_PRODUCTION_PRAGMAS. База создаётся '
+                'в файле.'
+            ),
+        )
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument(
+            '--templates', action='store_true',
+            help=(
+                'Дополнительно сравнить рендер лент без кеша шаблонов и '
+                'с кеширующим загрузчиком.'
+            ),
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help='Файл для результатов в JSON; по умолчанию stdout.',
+        )
+
+    def handle(self, *args, **options):
+        dataset = {
+            key: options[key]
+            for key in ('users', 'groups', 'posts', 'comments', 'images')
+        }
+        if min(dataset['users'], dataset['groups'], dataset['posts']) < 1:
+            raise CommandError(
+                'Нужны хотя бы один пользователь, одна группа и один пост.')
+        if options['requests'] < 1:
+            raise CommandError('Число запросов должно быть положительным.')
+        # Данные замера не должны попасть в рабочую базу и медиа.
+        media_root = tempfile.mkdtemp(prefix='yatube-benchmark-')
+        if options['contention']:
+            # Во время записи в базу в памяти читать её из других потоков
+            # нельзя, поэтому для замера конкуренции нужна база в файле.
+            if connection.vendor != 'sqlite':
+                raise CommandError('Замер конкуренции написан для SQLite.')
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                media_root, 'benchmark.sqlite3')
+        old_config = setup_databases(verbosity=0, interactive=False)
+        report = {
+            'environment': environment(),
+            'dataset': dataset,
+            'cached_feeds': options['cached'],
+        }
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                user = seed(**dataset)
+                report['routes'] = run_benchmark(
+                    user,
+                    routes=options['routes'] or ROUTES,
+                    requests=options['requests'],
+                    warmup=options['warmup'],
+                    cached=options['cached'],
+                )
+                if options['templates']:
+                    report['templates'] = run_template_benchmark(
+                        user, requests=options['requests'])
+                if options['contention']:
+                    report['contention'] = self.contention(user, options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+        report = json.dumps(
+            report,
+            ensure_ascii=False,
+            indent=2,
+            sort_keys=True,
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(report + '\n')
+            self.stderr.write(self.style.SUCCESS(
+                f'Результаты записаны в {options["output"]}.'))
+        else:
+            self.stdout.write(report)
+
+    def contention(self, user, options):
+        results = {}
+        profiles = {
+            'baseline': BASELINE_PRAGMAS,
+            'tuned': settings.SQLITE_PRODUCTION_PRAGMAS,
+        }
+        for name, pragmas in profiles.items():
+            # Режим журнала меняется только при единственном соединении.
+            connections.close_all()
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                connection.ensure_connection()
+                results[name] = run_contention(
+                    user,
+                    seconds=options['contention'],
+                    readers=options['readers'],
+                )
+                results[name]['pragmas'] = pragmas
+        return results
@@ -0,0 +1,49 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exporter import CHUNK_SIZE, FORMATS, KINDS, export
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты или комментарии в JSONL или CSV потоком, '
+        'не загружая таблицу в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--output', '-o',
+            help='Файл для выгрузки; по умолчанию stdout.',
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--since', help='Дата или дата-время начала.')
+        parser.add_argument(
+            '--until', help='Дата или дата-время конца (включительно).')
+        parser.add_argument('--author', help='Username автора.')
+        parser.add_argument('--group', help='Slug группы.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            chunks = export(
+                options['kind'],
+                format=options['format'],
+                compress=options['gzip'],
+                chunk_size=options['chunk_size'],
+                since=options['since'],
+                until=options['until'],
+                author=options['author'],
+                group=options['group'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+        else:
+            stdout = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+            stdout.writelines(chunks)
+            stdout.flush()
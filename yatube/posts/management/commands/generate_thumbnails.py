@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры картинок постов.'
+
+    def handle(self, *args, **options):
+        names = list(Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct().order_by())
+        for name in names:
+            generate_thumbnails(name)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {len(names)}.')
+        )
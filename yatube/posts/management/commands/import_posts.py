@@ -0,0 +1,80 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import FORMATS, PostImporter, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты из JSONL или CSV (поля text, author, group, '
+        'pub_date, image). Миниатюры картинок после импорта создаёт '
+        'команда generate_thumbnails.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с постами или - для stdin.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Число постов в одном INSERT.',
+        )
+        parser.add_argument(
+            '--transaction-size', type=int, default=10000,
+            help='Число записей в одной транзакции.',
+        )
+        parser.add_argument(
+            '--images-dir', default='',
+            help='Каталог, относительно которого указаны пути картинок.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков для копирования картинок.',
+        )
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать пользователей для неизвестных авторов.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        if min(options['batch_size'], options['transaction_size'],
+               options['workers']) < 1:
+            raise CommandError('Размеры пачек и число потоков должны быть '
+                               'положительными.')
+        importer = PostImporter(
+            batch_size=options['batch_size'],
+            transaction_size=options['transaction_size'],
+            images_dir=options['images_dir'],
+            workers=options['workers'],
+            create_authors=options['create_authors'],
+            progress=self.report_progress,
+        )
+        if path == '-':
+            stats = importer.run(read_records(sys.stdin, format))
+        else:
+            try:
+                stream = open(path, encoding='utf-8', newline='')
+            except OSError as error:
+                raise CommandError(f'Не удалось открыть {path}: {error}')
+            with stream:
+                stats = importer.run(read_records(stream, format))
+        for reason, count in stats.skipped.items():
+            self.stdout.write(self.style.WARNING(
+                f'Пропущено ({reason}): {count}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {stats.imported} из {stats.read}, '
+            f'картинок: {stats.images}, за {stats.seconds:.1f} с '
+            f'({stats.rate:.0f} постов/с).'
+        ))
+
+    def report_progress(self, stats):
+        self.stdout.write(
+            f'Прочитано {stats.read}, импортировано {stats.imported} '
+            f'({stats.rate:.0f} постов/с)'
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.timelines import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = 'Заново раскладывает посты по лентам подписок.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_timelines()
+        self.stdout.write(self.style.SUCCESS('Ленты подписок перестроены.'))
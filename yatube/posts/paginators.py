@@ -0,0 +1,172 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(moment, pk):
+    """Кодирует позицию записи в ленте (дата, id) в строку для URL."""
+    raw = f'{moment.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Восстанавливает (дата, id) из строки курсора."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        moment, pk = raw.split('|')
+        moment = parse_datetime(moment)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if moment is None:
+        raise InvalidCursor(cursor)
+    return moment, pk
+
+
+class ElidedPage(Page):
+    @property
+    def elided_page_range(self):
+        return list(self.paginator.get_elided_page_range(self.number))
+
+
+class ElidedPaginator(Paginator):
+    """Пагинатор по номеру страницы с сокращённым списком номеров.
+
+    Шаблону отдаются не все номера страниц, а только первые и последние
+    PAGINATOR_ON_ENDS и PAGINATOR_ON_EACH_SIDE вокруг текущей, поэтому
+    размер пагинатора не зависит от числа постов в ленте.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            # Заранее известное число записей заменяет COUNT(*).
+            self.count = count
+
+    def _get_page(self, *args, **kwargs):
+        return ElidedPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number=1, on_each_side=None,
+                              on_ends=None):
+        """Номера страниц вокруг number; пропуски заменены ELLIPSIS."""
+        if on_each_side is None:
+            on_each_side = settings.PAGINATOR_ON_EACH_SIDE
+        if on_ends is None:
+            on_ends = settings.PAGINATOR_ON_ENDS
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > on_each_side + on_ends + 2:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page, который нужен шаблону
+    posts/includes/paginator.html, но не знает общего числа страниц.
+    """
+
+    def __init__(self, object_list, paginator, cursor, next_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.number = None
+
+    def __repr__(self):
+        return f'<Page after {self.cursor or "start"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинатор по ключу (дата, id) без COUNT и OFFSET.
+
+    Каждая следующая страница выбирается условием «строго дальше
+    последней записи предыдущей страницы», поэтому время ответа не зависит
+    от глубины страницы. По умолчанию листает посты от новых к старым.
+    """
+
+    is_cursor = True
+    page_range = range(0)
+
+    def __init__(self, object_list, per_page, field='pub_date',
+                 descending=True):
+        self.field = field
+        self.descending = descending
+        prefix = '-' if descending else ''
+        self.object_list = object_list.order_by(
+            prefix + field, prefix + 'id'
+        )
+        self.per_page = int(per_page)
+
+    def cursor_for(self, obj):
+        return encode_cursor(getattr(obj, self.field), obj.pk)
+
+    def page_queryset(self, cursor):
+        """Запрос страницы: на одну запись больше, чтобы узнать о следующей."""
+        queryset = self.object_list
+        if cursor:
+            moment, pk = decode_cursor(cursor)
+            lookup = 'lt' if self.descending else 'gt'
+            # Нестрогое условие по дате позволяет СУБД начать чтение индекса
+            # сразу с нужного места, а не отбрасывать предыдущие страницы.
+            queryset = queryset.filter(**{
+                f'{self.field}__{lookup}e': moment
+            }).filter(
+                Q(**{f'{self.field}__{lookup}': moment})
+                | Q(**{f'pk__{lookup}': pk})
+            )
+        return queryset[:self.per_page + 1]
+
+    def page(self, cursor):
+        object_list = list(self.page_queryset(cursor))
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.cursor_for(object_list[-1])
+        return CursorPage(object_list, self, cursor or None, next_cursor)
+
+    def get_page(self, cursor):
+        """Как Paginator.get_page: при битом курсоре отдаёт первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
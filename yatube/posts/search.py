@@ -0,0 +1,109 @@
+import re
+
+from django.db import connection
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+
+
+def search_available():
+    """Полнотекстовый индекс есть только у SQLite (FTS5)."""
+    return connection.vendor == 'sqlite'
+
+
+def build_match(query):
+    """Превращает пользовательский запрос в выражение MATCH для FTS5.
+
+    Каждое слово ищется как префикс, все слова обязательны. Кавычки и
+    операторы FTS5 из запроса отбрасываются.
+    """
+    words = WORD_RE.findall(query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_posts(posts):
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) '
+            'VALUES (%s, %s)',
+            [(post.pk, post.text) for post in posts]
+        )
+
+
+def unindex_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+
+def rebuild_index(chunk_size=2000):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    posts = Post.objects.only('text').order_by().iterator(chunk_size)
+    chunk = []
+    for post in posts:
+        chunk.append(post)
+        if len(chunk) == chunk_size:
+            index_posts(chunk)
+            chunk = []
+    if chunk:
+        index_posts(chunk)
+
+
+def filter_matching(posts, query):
+    """Оставляет в запросе постов только подходящие под поисковый запрос."""
+    # RawSQL в pk__in оборачивается в лишние скобки и превращается
+    # в скалярный подзапрос, поэтому условие задаётся через extra.
+    return posts.extra(
+        where=[
+            f'{Post._meta.db_table}.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        ],
+        params=[build_match(query)],
+    )
+
+
+class SearchResults:
+    """Результаты поиска по релевантности для django Paginator.
+
+    Paginator нужны только count() и срезы, поэтому каждая страница — это
+    один запрос к FTS-индексу с LIMIT/OFFSET и один запрос постов по id.
+    """
+
+    def __init__(self, query, posts=None):
+        self.match = build_match(query)
+        self.posts = Post.objects.for_feed() if posts is None else posts
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        if not self.match or index.stop is None or index.stop <= start:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, index.stop - start, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        found = self.posts.in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
@@ -0,0 +1,203 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .counters import (change_author_followers, change_author_posts,
+                       change_group_posts, change_index_posts,
+                       change_post_comments)
+from .feed_cache import (INDEX_FEED, group_feed, invalidate_feeds, post_feeds,
+                         post_page, profile_feed)
+from .models import Comment, Follow, Group, Post, User
+from .search import index_posts, search_available, unindex_post
+from .thumbnails import queue_thumbnails, release_image, unclaim_images
+from .timelines import backfill_if_no_longer_popular, fan_out_post
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    """При переносе поста в другую группу нужно обновить и старую, а при
+    замене картинки — освободить прежнюю."""
+    group_id, slug, image = None, None, ''
+    if instance.pk is not None:
+        group_id, slug, image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list(
+            'group_id', 'group__slug', 'image'
+        ).first() or (None, None, '')
+    instance._previous_group = (group_id, slug)
+    instance._previous_image = image
+
+
+@receiver(post_save, sender=Post)
+def invalidate_on_save(sender, instance, **kwargs):
+    feeds = set(post_feeds(instance))
+    _, previous_slug = getattr(instance, '_previous_group', (None, None))
+    if previous_slug is not None:
+        feeds.add(group_feed(previous_slug))
+    invalidate_feeds(*feeds)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_on_delete(sender, instance, **kwargs):
+    invalidate_feeds(*post_feeds(instance))
+
+
+@receiver(post_save, sender=Post)
+def count_post_on_save(sender, instance, created, **kwargs):
+    if created:
+        change_index_posts(1)
+        change_author_posts(instance.author_id, 1)
+        if instance.group_id is not None:
+            change_group_posts(instance.group_id, 1)
+        return
+    previous_group_id, _ = getattr(instance, '_previous_group', (None, None))
+    if previous_group_id == instance.group_id:
+        return
+    if previous_group_id is not None:
+        change_group_posts(previous_group_id, -1)
+    if instance.group_id is not None:
+        change_group_posts(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_post_on_delete(sender, instance, **kwargs):
+    change_index_posts(-1)
+    change_author_posts(instance.author_id, -1)
+    if instance.group_id is not None:
+        change_group_posts(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_image', '')
+    if previous and previous != instance.image.name:
+        release_image(previous)
+
+
+@receiver(post_save, sender=Post)
+def queue_new_image_thumbnails(sender, instance, **kwargs):
+    """Новая картинка отправляется на нарезку, как бы пост ни сохранили."""
+    if instance.image.name != getattr(instance, '_previous_image', ''):
+        queue_thumbnails(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def unclaim_saved_image(sender, instance, **kwargs):
+    unclaim_images([instance.image.name])
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_on_save(sender, instance, created, **kwargs):
+    if created:
+        change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_on_delete(sender, instance, **kwargs):
+    change_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_page(sender, instance, **kwargs):
+    invalidate_feeds(post_page(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    invalidate_feeds(group_feed(instance.slug))
+
+
+# Поля пользователя, которые видны на страницах: имя автора в карточках
+# постов и на его странице, username в комментариях и адресах.
+USER_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_name(sender, instance, update_fields=None, **kwargs):
+    """Запоминает имя пользователя, чтобы сбросить страницы, где оно
+    показано. Сохранения других полей, например last_login при входе, ничего
+    не сбрасывают."""
+    instance._previous_name = None
+    if instance.pk is None or (
+        update_fields is not None
+        and not set(update_fields) & set(USER_NAME_FIELDS)
+    ):
+        return
+    instance._previous_name = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*USER_NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, **kwargs):
+    """Сбрасывает страницы, на которых видно изменившееся имя.
+
+    Страницы постов зависят от ленты автора, поэтому отдельно сбрасываются
+    только посты, где пользователь оставлял комментарии.
+    """
+    previous = getattr(instance, '_previous_name', None)
+    current = tuple(getattr(instance, field) for field in USER_NAME_FIELDS)
+    if previous is None or previous == current:
+        return
+    feeds = {profile_feed(previous[0]), profile_feed(instance.username)}
+    posts = Post.objects.filter(author=instance)
+    if posts.exists():
+        feeds.add(INDEX_FEED)
+        feeds.update(
+            group_feed(slug) for slug in posts.filter(
+                group__isnull=False
+            ).values_list('group__slug', flat=True).distinct()
+        )
+    feeds.update(
+        post_page(post_id) for post_id in Comment.objects.filter(
+            author=instance
+        ).values_list('post_id', flat=True).distinct()
+    )
+    invalidate_feeds(*feeds)
+
+
+@receiver(post_save, sender=Post)
+def index_on_save(sender, instance, **kwargs):
+    if search_available():
+        index_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_on_delete(sender, instance, **kwargs):
+    if search_available():
+        unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_on_create(sender, instance, created, **kwargs):
+    if created:
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_followed_profile(sender, instance, **kwargs):
+    """На странице автора есть кнопка подписки."""
+    invalidate_feeds(profile_feed(instance.author.username))
+
+
+@receiver(post_save, sender=Follow)
+def count_follow_on_save(sender, instance, created, **kwargs):
+    if created:
+        change_author_followers(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_follow_on_delete(sender, instance, **kwargs):
+    change_author_followers(instance.author_id, -1)
+
+
+@receiver(post_delete, sender=Follow)
+def backfill_unpopular_author(sender, instance, **kwargs):
+    """Подключён после count_follow_on_delete и видит новый счётчик."""
+    backfill_if_no_longer_popular(instance.author_id)
@@ -0,0 +1,78 @@
+import hashlib
+import os
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Сколько секунд метка сохранения защищает файл от release_image, если
+# транзакцию загрузки так и не завершили.
+CLAIM_TIMEOUT = 60 * 10
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, которое называет файлы по SHA-256 содержимого.
+
+    Файл сохраняется как <каталог>/<первые два знака хеша>/<хеш>.<расш.>,
+    поэтому одинаковые загрузки попадают в один файл: второй раз он не
+    записывается, а sorl-thumbnail находит для него уже готовые миниатюры.
+    Удаляет такие файлы только release_image, когда на них не ссылается
+    ни один пост.
+
+    Сохранение, которое нашло готовый файл, ничего не пишет, а пост с ним
+    появится в базе только после коммита. Поэтому save ставит на имя
+    метку в общем кеше, а delete_unused не удаляет помеченные файлы;
+    метку снимает unclaim после коммита поста.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        # Метка ставится до проверки exists: если delete_unused успеет
+        # убрать файл после проверки, он увидит метку и вернёт файл.
+        cache.set(self.claim_key(name), True, CLAIM_TIMEOUT)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def claim_key(self, name):
+        return f'image-claim:{name}'
+
+    def unclaim(self, name):
+        cache.delete(self.claim_key(name))
+
+    def delete_unused(self, name, in_use):
+        """Удаляет файл, если in_use() ложно и его никто не сохраняет.
+
+        Файл сначала переименовывается, затем проверки повторяются: если
+        за это время его сохранили снова, файл возвращается на место.
+        Возвращает True, если файла больше нет.
+        """
+        if cache.get(self.claim_key(name)) or in_use():
+            return False
+        path = self.path(name)
+        trash = path + '.deleting'
+        try:
+            os.replace(path, trash)
+        except FileNotFoundError:
+            return True
+        if cache.get(self.claim_key(name)) or in_use():
+            os.replace(trash, path)
+            return False
+        os.remove(trash)
+        return True
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
@@ -0,0 +1,257 @@
+import os
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from posts.feed_cache import INDEX_FEED, get_feed_version, invalidate_feeds
+from posts.models import Comment, Group, Post, User
+
+from .utils import execute_on_commit
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cache-author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cache-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-cache-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Закешированный пост',
+        )
+        cls.index_url = reverse('posts:index')
+        cls.group_url = reverse(
+            'posts:group_list', kwargs={'slug': cls.group.slug})
+        cls.other_group_url = reverse(
+            'posts:group_list', kwargs={'slug': cls.other_group.slug})
+        cls.profile_url = reverse(
+            'posts:profile', kwargs={'username': cls.author.username})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_feed_served_from_cache(self):
+        """Повторный запрос анонимного пользователя не обращается к БД."""
+        for url in (self.index_url, self.group_url, self.profile_url):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(first.content, second.content)
+
+    def test_pages_are_cached_separately(self):
+        """Каждая страница ленты кешируется под своим ключом."""
+        self.client.get(self.index_url)
+        response = self.client.get(self.index_url + '?page=2')
+        self.assertIsNotNone(response.context)
+
+    def test_other_params_share_cached_page(self):
+        """Параметры, кроме page и after, не создают новых записей в кеше."""
+        self.client.get(self.index_url)
+        with self.assertNumQueries(0):
+            self.client.get(self.index_url + '?utm_source=random')
+
+    def test_missing_pages_are_not_cached(self):
+        """Несуществующий номер страницы и битый курсор не кладутся
+        в кеш."""
+        for query in ('?page=999', '?page=abc', '?after=broken'):
+            with self.subTest(query=query):
+                self.client.get(self.index_url + query)
+                response = self.client.get(self.index_url + query)
+                self.assertIsNotNone(response.context)
+
+    def test_new_post_invalidates_feeds(self):
+        """Новый пост сбрасывает кеш главной, группы и профиля автора."""
+        urls = (self.index_url, self.group_url, self.profile_url)
+        for url in urls:
+            self.client.get(url)
+        with execute_on_commit():
+            Post.objects.create(
+                author=self.author,
+                group=self.group,
+                text='Свежий пост',
+            )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежий пост')
+
+    def test_versions_change_after_commit(self):
+        """До коммита версии лент не меняются: запрос, который ещё видит
+        старые строки, не положит старую страницу под новую версию."""
+        version = get_feed_version(INDEX_FEED)
+        with execute_on_commit():
+            Post.objects.create(author=self.author, text='Свежий пост')
+            self.assertEqual(get_feed_version(INDEX_FEED), version)
+        self.assertGreater(get_feed_version(INDEX_FEED), version)
+
+    def test_unrelated_feeds_stay_cached(self):
+        """Пост в одной группе не сбрасывает кеш другой группы."""
+        self.client.get(self.other_group_url)
+        Post.objects.create(
+            author=self.author,
+            group=self.group,
+            text='Свежий пост',
+        )
+        with self.assertNumQueries(0):
+            self.client.get(self.other_group_url)
+
+    def test_moving_post_invalidates_previous_group(self):
+        """Перенос поста в другую группу сбрасывает кеш обеих групп."""
+        self.client.get(self.group_url)
+        self.client.get(self.other_group_url)
+        self.post.group = self.other_group
+        with execute_on_commit():
+            self.post.save()
+        self.assertNotContains(
+            self.client.get(self.group_url), self.post.text)
+        self.assertContains(
+            self.client.get(self.other_group_url), self.post.text)
+
+    def test_deleted_post_invalidates_feeds(self):
+        """Удаление поста сбрасывает кеш лент."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост на удаление',
+        )
+        self.client.get(self.index_url)
+        with execute_on_commit():
+            post.delete()
+        self.assertNotContains(
+            self.client.get(self.index_url), 'Пост на удаление')
+
+    def test_authorized_user_bypasses_cache(self):
+        """Авторизованному пользователю лента рендерится заново."""
+        self.client.get(self.index_url)
+        self.client.force_login(self.author)
+        response = self.client.get(self.index_url)
+        self.assertIsNotNone(response.context)
+
+    @skipUnless(hasattr(os, 'fork'), 'нужен fork')
+    def test_invalidation_from_another_process_is_seen(self):
+        """Версию ленты, сдвинутую другим процессом сервера, видят все."""
+        self.client.get(self.index_url)
+        version = get_feed_version(INDEX_FEED)
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                with execute_on_commit():
+                    invalidate_feeds(INDEX_FEED)
+                status = 0
+            finally:
+                os._exit(status)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        self.assertGreater(get_feed_version(INDEX_FEED), version)
+        with self.assertNumQueries(2):
+            self.client.get(self.index_url)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag-author')
+        cls.reader = User.objects.create_user(username='etag-reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='etag-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Пост с ETag',
+        )
+        cls.group_url = reverse(
+            'posts:group_list', kwargs={'slug': cls.group.slug})
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk})
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, response):
+        return self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_unchanged_pages_return_304(self):
+        """Неизменившаяся страница отдаётся как 304 без рендера."""
+        for url in (reverse('posts:index'), self.group_url, self.detail_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                with self.assertTemplateNotUsed('base.html'):
+                    repeat = self.revalidate(url, response)
+                self.assertEqual(repeat.status_code, 304)
+
+    def test_feed_304_without_queries(self):
+        """Для ленты ETag считается без запросов к БД."""
+        response = self.client.get(self.group_url)
+        with self.assertNumQueries(0):
+            repeat = self.revalidate(self.group_url, response)
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        """Правка поста и новый комментарий меняют ETag страницы поста."""
+        response = self.client.get(self.detail_url)
+        self.post.text = 'Новый текст'
+        with execute_on_commit():
+            self.post.save()
+        response = self.revalidate(self.detail_url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый текст')
+        with execute_on_commit():
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий')
+        response = self.revalidate(self.detail_url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+    def test_group_and_author_changes_invalidate_etag(self):
+        """Новое название группы и новое имя автора меняют ETag страницы
+        поста."""
+        response = self.client.get(self.detail_url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        with execute_on_commit():
+            group.save()
+        response = self.revalidate(self.detail_url, response)
+        self.assertContains(response, 'Новое название')
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое'
+        author.last_name = 'Имя'
+        with execute_on_commit():
+            author.save()
+        response = self.revalidate(self.detail_url, response)
+        self.assertContains(response, 'Новое Имя')
+
+    def test_login_keeps_etag(self):
+        """Вход пользователя сохраняет last_login, но страниц не меняет."""
+        response = self.client.get(self.detail_url)
+        author = User.objects.get(pk=self.author.pk)
+        with execute_on_commit():
+            author.save(update_fields=['last_login'])
+        self.assertEqual(
+            self.revalidate(self.detail_url, response).status_code, 304)
+
+    def test_etag_depends_on_user(self):
+        """Страница анонима не подходит вошедшему пользователю."""
+        response = self.client.get(self.group_url)
+        self.client.force_login(self.reader)
+        self.assertEqual(
+            self.revalidate(self.group_url, response).status_code, 200)
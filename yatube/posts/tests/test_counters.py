@@ -0,0 +1,154 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from posts import counters
+from posts.counters import INDEX_POSTS_KEY, index_posts_count
+from posts.models import AuthorStats, Comment, Group, Post, User
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counter-author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='counter-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-counter-slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, author_posts, group_posts, other_group_posts):
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count,
+            author_posts
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, group_posts)
+        self.assertEqual(self.other_group.posts_count, other_group_posts)
+
+    def test_post_counters(self):
+        """Счётчики постов автора и групп следуют за созданием, переносом и
+        удалением постов."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+        Post.objects.create(author=self.author, text='Пост без группы')
+        self.assertCounters(2, 1, 0)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(2, 0, 1)
+        post.delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_stats_created_concurrently(self):
+        """Если строку счётчиков автора создали между обновлением и
+        вставкой, изменение применяется к ней без IntegrityError."""
+        Post.objects.create(author=self.author, text='Пост')
+        change = counters._change
+        calls = []
+
+        def miss_first_update(queryset, field, delta):
+            calls.append(field)
+            if len(calls) == 1:
+                return 0
+            return change(queryset, field, delta)
+
+        with mock.patch.object(counters, '_change', miss_first_update):
+            counters.change_author_posts(self.author.pk, 1)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 2)
+
+    def test_comment_counter(self):
+        """Счётчик комментариев поста следует за комментариями."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            author=self.author, post=post, text='Комментарий')
+        Comment.objects.create(author=self.author, post=post, text='Ещё')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_rebuild_counters(self):
+        """Команда rebuild_counters восстанавливает счётчики по данным."""
+        Post.objects.bulk_create([
+            Post(author=self.author, group=self.group, text=f'Пост {i}')
+            for i in range(3)
+        ])
+        post = Post.objects.first()
+        Comment.objects.bulk_create([
+            Comment(author=self.author, post=post, text='Комментарий')
+        ])
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCounters(3, 3, 0)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_profile_uses_counter(self):
+        """Страница профиля не считает посты автора запросом COUNT."""
+        Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.filter(user=self.author).update(posts_count=42)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.author}))
+        self.assertEqual(response.context['count'], 42)
+
+
+@override_settings(FEED_EXACT_COUNT_LIMIT=3)
+class FeedCountTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='count-author')
+        self.group = Group.objects.create(
+            title='Группа', slug='count-slug', description='Описание')
+        self.url = reverse('posts:index')
+
+    def create_posts(self, count):
+        for i in range(count):
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {i}')
+
+    def test_index_counter_follows_posts(self):
+        """Счётчик главной меняется вместе с постами после коммита."""
+        self.create_posts(2)
+        self.assertEqual(index_posts_count(), 2)
+        self.create_posts(1)
+        Post.objects.first().delete()
+        self.assertEqual(cache.get(INDEX_POSTS_KEY), 2)
+
+    def test_large_feeds_use_cached_count(self):
+        self.create_posts(4)
+        cache.set(INDEX_POSTS_KEY, 25)
+        self.group.posts_count = 35
+        self.group.save(update_fields=['posts_count'])
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        for url, expected in ((self.url, 25), (group_url, 35)):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    response.context['page_obj'].paginator.count, expected)
+        # Сбрасываем и закешированные страницы лент.
+        cache.clear()
+        cache.set(INDEX_POSTS_KEY, 25)
+        with override_settings(FEED_COUNTS={}):
+            for url in (self.url, group_url):
+                with self.subTest(url=url, counts='exact'):
+                    response = self.client.get(url)
+                    self.assertEqual(
+                        response.context['page_obj'].paginator.count, 4)
+
+    def test_small_feeds_are_counted_exactly(self):
+        self.create_posts(2)
+        cache.set(INDEX_POSTS_KEY, 25)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
@@ -0,0 +1,96 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Comment, Group, Post, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='exporter')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='export-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост в группе')
+        cls.other_post = Post.objects.create(
+            author=cls.staff, text='Пост без группы')
+        Comment.objects.create(
+            post=cls.post, author=cls.staff, text='Комментарий')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_command_exports_filtered_jsonl(self):
+        """Команда выгружает посты в JSONL с фильтром по группе."""
+        path = os.path.join(TEMP_DIR, 'posts.jsonl')
+        call_command('export_posts', 'posts', '--group', 'export-slug',
+                     '--output', path)
+        with open(path, encoding='utf-8') as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], self.post.pk)
+        self.assertEqual(rows[0]['author'], 'exporter')
+        self.assertEqual(rows[0]['group'], 'export-slug')
+
+    def test_command_exports_gzipped_csv(self):
+        """Комментарии выгружаются в CSV, сжатый gzip."""
+        path = os.path.join(TEMP_DIR, 'comments.csv.gz')
+        call_command('export_posts', 'comments', '--format', 'csv',
+                     '--gzip', '--output', path)
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['post'], str(self.post.pk))
+        self.assertEqual(rows[0]['text'], 'Комментарий')
+
+    def test_date_filter(self):
+        """Фильтр по датам отсекает посты вне диапазона."""
+        path = os.path.join(TEMP_DIR, 'old.jsonl')
+        call_command('export_posts', 'posts', '--until', '2000-01-01',
+                     '--output', path)
+        with open(path, encoding='utf-8') as file:
+            self.assertEqual(file.read(), '')
+
+    def test_endpoint_is_staff_only(self):
+        """Выгрузка по HTTP доступна только сотрудникам."""
+        url = reverse('posts:export', kwargs={'kind': 'posts'})
+        self.client.force_login(self.author)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {'gzip': '1', 'author': 'staff'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        rows = [json.loads(line) for line in io.StringIO(content.decode())]
+        self.assertEqual([row['id'] for row in rows], [self.other_post.pk])
+
+    def test_endpoint_rejects_bad_filters(self):
+        """Неверная дата и неизвестный тип выгрузки отклоняются."""
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:export', kwargs={'kind': 'posts'}),
+            {'since': 'вчера'},
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            reverse('posts:export', kwargs={'kind': 'users'}))
+        self.assertEqual(response.status_code, 404)
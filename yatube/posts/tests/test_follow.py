@@ -0,0 +1,108 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.timelines import timeline_posts
+
+from .utils import execute_on_commit
+
+
+class FollowTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def follow(self, author):
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': author.username}))
+
+    def get_feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_and_unfollow(self):
+        """Подписка и отписка меняют ленту подписок."""
+        self.follow(self.author)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(self.get_feed(), [self.old_post])
+        self.client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertFalse(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(self.get_feed(), [])
+
+    def test_cannot_follow_self(self):
+        """На себя подписаться нельзя."""
+        self.follow(self.reader)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает только в ленты подписчиков автора."""
+        self.follow(self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.get_feed(), [post, self.old_post])
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.get_feed(), [])
+
+    @override_settings(FOLLOW_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора не раскладываются по лентам, но
+        показываются в ленте подписчика."""
+        self.follow(self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed(), [post, self.old_post])
+
+    @override_settings(FOLLOW_FANOUT_LIMIT=1)
+    def test_posts_of_formerly_popular_author_are_backfilled(self):
+        """Посты, опубликованные, пока автор был популярным, попадают в
+        ленты подписчиков, когда подписчиков становится меньше."""
+        self.follow(self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        with execute_on_commit():
+            Follow.objects.filter(user=self.stranger).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.get_feed(), [post, self.old_post])
+
+    def test_rebuild_timelines(self):
+        """Команда rebuild_timelines восстанавливает ленты подписок."""
+        self.follow(self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.get_feed(), [self.old_post])
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+    def test_timeline_is_index_range_scan(self):
+        """Лента читается по индексу (user, -pub_date); досортировываются
+        только посты с одинаковой датой."""
+        self.follow(self.author)
+        sql, params = timeline_posts(
+            self.reader)[:10].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertIn('timeline_user_pub_date_idx', plan[0], plan)
+        self.assertFalse(
+            any('TEMP B-TREE FOR ORDER BY' in step for step in plan), plan)
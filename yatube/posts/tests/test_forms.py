@@ -1,10 +1,12 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 from posts.models import Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -119,6 +121,50 @@ class PostFormTests(TestCase):
         self.assertEqual(Post.objects.count(), post_count + 1)
         self.assertTrue(Post.objects.latest('id'))
 
+    @override_settings(POST_IMAGE_MAX_SIZE=(400, 400))
+    def test_uploaded_image_is_downscaled_and_reencoded(self):
+        """Большая картинка уменьшается, перекодируется в WebP, а её
+        размеры записываются в пост."""
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 600), 'red').save(buffer, 'JPEG')
+        uploaded = SimpleUploadedFile(
+            'photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с большой картинкой',
+            'image': uploaded,
+        })
+        post = Post.objects.get(text='Пост с большой картинкой')
+        self.assertRegex(post.image.name, r'^posts/.+\.webp$')
+        self.assertEqual((post.image_width, post.image_height), (400, 200))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (400, 200))
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertContains(
+            response, f'src="{post.image.url}" width="400" height="200"')
+
+    @override_settings(POST_IMAGE_MAX_SIZE=(400, 400))
+    def test_large_animation_is_downscaled(self):
+        """Большая анимация уменьшается и не теряет кадры."""
+        frames = [Image.new('RGB', (1200, 600), color)
+                  for color in ('red', 'blue', 'green')]
+        buffer = BytesIO()
+        frames[0].save(buffer, 'GIF', save_all=True,
+                       append_images=frames[1:], duration=100, loop=0)
+        uploaded = SimpleUploadedFile(
+            'anim.gif', buffer.getvalue(), content_type='image/gif')
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с анимацией',
+            'image': uploaded,
+        })
+        post = Post.objects.get(text='Пост с анимацией')
+        self.assertRegex(post.image.name, r'^posts/.+\.gif$')
+        self.assertEqual((post.image_width, post.image_height), (400, 200))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (400, 200))
+            self.assertEqual(image.n_frames, 3)
+
     def test_anonymous_create_post(self):
         """Не авторизованный пользователь не может создать пост"""
         post_count = Post.objects.count()
@@ -0,0 +1,180 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.feed_cache import INDEX_FEED, get_feed_version
+from posts.importer import PostImporter
+from posts.models import AuthorStats, Follow, Group, Post, TimelineEntry, User
+from posts.search import SearchResults, search_available
+
+from .test_thumbnails import SMALL_GIF
+from .utils import execute_on_commit
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=os.path.join(TEMP_DIR, 'media'))
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='importer')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='import-slug',
+            description='Тестовое описание',
+        )
+        Path(TEMP_DIR, 'pic.gif').write_bytes(SMALL_GIF)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def import_posts(self, name, content, *args):
+        path = Path(TEMP_DIR, name)
+        path.write_text(content, encoding='utf-8')
+        out = StringIO()
+        with execute_on_commit():
+            call_command(
+                'import_posts', str(path), '--images-dir', TEMP_DIR,
+                '--batch-size', '2', '--transaction-size', '3', *args,
+                stdout=out,
+            )
+        return out.getvalue()
+
+    def test_import_jsonl(self):
+        """Посты загружаются пачками с датами, картинками, счётчиками,
+        поиском и лентами подписок; негодные записи пропускаются."""
+        records = [
+            {'text': f'Импорт {i}', 'author': 'importer',
+             'group': 'import-slug',
+             'pub_date': f'2020-01-0{i + 1}T12:00:00'}
+            for i in range(4)
+        ] + [
+            {'text': 'С картинкой', 'author': 'importer', 'image': 'pic.gif'},
+            {'text': 'Чужой', 'author': 'nobody'},
+            {'text': '', 'author': 'importer'},
+        ]
+        self.client.get(reverse('posts:index'))
+        output = self.import_posts(
+            'posts.jsonl', '\n'.join(json.dumps(r) for r in records))
+        self.assertIn('Импортировано постов: 5 из 7', output)
+        self.assertEqual(Post.objects.count(), 5)
+        first = Post.objects.get(text='Импорт 0')
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(first.group, self.group)
+        image_post = Post.objects.get(text='С картинкой')
+        self.assertTrue(image_post.image.storage.exists(image_post.image.name))
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 5)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 4)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 5)
+        if search_available():
+            self.assertEqual(SearchResults('Импорт').count(), 4)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'С картинкой')
+
+    def test_import_csv_creates_authors(self):
+        """CSV с неизвестными авторами загружается с --create-authors."""
+        self.import_posts(
+            'posts.csv',
+            'text,author,group\nПервый,new-author,\nВторой,new-author,\n',
+            '--create-authors',
+        )
+        author = User.objects.get(username='new-author')
+        self.assertEqual(author.posts.count(), 2)
+        self.assertEqual(author.stats.posts_count, 2)
+
+    def test_broken_records_are_skipped(self):
+        """Битые строки пропускаются, остальные посты загружаются и
+        сбрасывают кеш лент."""
+        version = get_feed_version(INDEX_FEED)
+        content = '\n'.join([
+            json.dumps({'text': 'Первый', 'author': 'importer'}),
+            'not json',
+            json.dumps(['список']),
+            json.dumps({'text': ['не строка'], 'author': 'importer'}),
+            json.dumps({'text': 'Второй', 'author': 'importer'}),
+        ])
+        output = self.import_posts(
+            'posts.jsonl', content, '--transaction-size', '1')
+        self.assertIn('Импортировано постов: 2 из 5', output)
+        self.assertIn('Пропущено (неверная запись): 3', output)
+        self.assertGreater(get_feed_version(INDEX_FEED), version)
+
+    def test_committed_chunks_invalidate_feeds_when_later_fails(self):
+        """Упавшая порция не отменяет сброс кеша уже загруженных."""
+        version = get_feed_version(INDEX_FEED)
+        insert = PostImporter.insert
+        calls = []
+
+        def insert_once(importer, posts):
+            calls.append(posts)
+            if len(calls) > 1:
+                raise RuntimeError
+            insert(importer, posts)
+
+        records = [
+            {'text': f'Пост {i}', 'author': 'importer'} for i in range(2)
+        ]
+        with mock.patch.object(PostImporter, 'insert', insert_once):
+            with self.assertRaises(RuntimeError):
+                self.import_posts(
+                    'posts.jsonl', '\n'.join(json.dumps(r) for r in records),
+                    '--transaction-size', '1')
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertGreater(get_feed_version(INDEX_FEED), version)
+
+    def test_undecodable_images_are_skipped(self):
+        """Картинки, которые Pillow не читает, пропускают только свою
+        запись."""
+        Path(TEMP_DIR, 'broken.gif').write_bytes(SMALL_GIF[:10])
+        records = [
+            {'text': 'Битая', 'author': 'importer', 'image': 'broken.gif'},
+            {'text': 'Бомба', 'author': 'importer', 'image': 'pic.gif'},
+            {'text': 'Без картинки', 'author': 'importer'},
+        ]
+        with mock.patch('PIL.Image.MAX_IMAGE_PIXELS', 0):
+            output = self.import_posts(
+                'posts.jsonl', '\n'.join(json.dumps(r) for r in records))
+        self.assertIn('Импортировано постов: 1 из 3', output)
+        self.assertIn('картинка не найдена или повреждена): 2', output)
+
+    def test_failed_chunk_releases_copied_images(self):
+        """Если порция не вставилась, её картинки удаляются."""
+        Path(TEMP_DIR, 'only.gif').write_bytes(SMALL_GIF + b'\x00')
+        record = {'text': 'С картинкой', 'author': 'importer',
+                  'image': 'only.gif'}
+        saved = []
+        storage = Post._meta.get_field('image').storage
+        save = storage.save
+
+        def remember(*args, **kwargs):
+            saved.append(save(*args, **kwargs))
+            return saved[-1]
+
+        with mock.patch.object(
+            PostImporter, 'insert', side_effect=RuntimeError
+        ), mock.patch.object(storage, 'save', remember):
+            with self.assertRaises(RuntimeError):
+                self.import_posts('posts.jsonl', json.dumps(record))
+        self.assertEqual(len(saved), 1)
+        self.assertFalse(storage.exists(saved[0]))
+        self.assertFalse(Post.objects.filter(text='С картинкой').exists())
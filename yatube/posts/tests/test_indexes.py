@@ -0,0 +1,79 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from posts.models import Comment, Group, Post, User
+from posts.paginators import CursorPaginator
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='index-author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='index-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+
+    def get_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndexes(self, queryset, seek=False):
+        """Нет сортировки во временном B-дереве и полного чтения таблиц
+        постов и комментариев; при seek=True чтение постов начинается
+        поиском по индексу, а не с начала индекса."""
+        plan = self.get_plan(queryset)
+        for step in plan:
+            self.assertNotIn('TEMP B-TREE', step, plan)
+            words = step.replace(' TABLE ', ' ').split()
+            if words[1] not in ('posts_post', 'posts_comment'):
+                continue
+            if words[0] == 'SCAN':
+                self.assertFalse(seek, plan)
+                self.assertIn('USING', words, plan)
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не сортируют посты во временной таблице и не
+        читают таблицу постов целиком."""
+        feeds = {
+            'index': Post.objects.for_feed(),
+            'group': self.group.posts.for_feed(),
+            'profile': self.author.posts.for_feed(),
+        }
+        for name, posts in feeds.items():
+            paginator = CursorPaginator(posts, 10)
+            querysets = {
+                'page': posts[10:20],
+                'cursor_first': paginator.page_queryset(None),
+                'cursor_next': paginator.page_queryset(
+                    paginator.cursor_for(self.post)),
+            }
+            for kind, queryset in querysets.items():
+                with self.subTest(feed=name, kind=kind):
+                    self.assertUsesIndexes(
+                        queryset, seek=kind == 'cursor_next')
+
+    def test_comments_query_uses_index(self):
+        """Комментарии поста выбираются по индексу (post, created)."""
+        comment = Comment.objects.create(
+            author=self.author, post=self.post, text='Комментарий')
+        paginator = CursorPaginator(
+            self.post.comments.select_related('author'), 20,
+            field='created', descending=False,
+        )
+        self.assertUsesIndexes(paginator.page_queryset(None), seek=True)
+        self.assertUsesIndexes(
+            paginator.page_queryset(paginator.cursor_for(comment)),
+            seek=True
+        )
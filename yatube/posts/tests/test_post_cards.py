@@ -0,0 +1,47 @@
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Group, Post, User
+from posts.templatetags.post_cards import TEXT_MARKER, UrlPattern
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user.name+tag@x')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group_slug-1',
+            description='Описание',
+        )
+        Post.objects.create(author=cls.user, text='Без группы')
+        Post.objects.create(author=cls.user, text='В группе', group=cls.group)
+
+    def test_url_pattern_matches_reverse(self):
+        for viewname, value in (
+            ('posts:profile', self.user.username),
+            ('posts:profile', 'пользователь'),
+            ('posts:group_list', self.group.slug),
+        ):
+            with self.subTest(viewname=viewname, value=value):
+                self.assertEqual(
+                    UrlPattern(viewname, TEXT_MARKER)(value),
+                    reverse(viewname, args=[value]),
+                )
+
+    def test_cards_render_links_of_every_post(self):
+        posts = list(Post.objects.for_feed().order_by('pk'))
+        html = Template(
+            '{% load post_cards %}'
+            '{% for post in posts %}{% post_card post %}{% endfor %}'
+        ).render(Context({'posts': posts}))
+        for post in posts:
+            with self.subTest(post=post.text):
+                self.assertIn(post.text, html)
+                self.assertIn(
+                    reverse('posts:post_detail', args=[post.pk]), html)
+        self.assertEqual(html.count(
+            reverse('posts:profile', args=[self.user.username])), 2)
+        self.assertEqual(html.count(
+            reverse('posts:group_list', args=[self.group.slug])), 1)
+        self.assertEqual(html.count('<hr>'), 1)
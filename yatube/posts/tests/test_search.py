@@ -0,0 +1,93 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Post, User
+from posts.search import FTS_TABLE
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Индекс FTS5 есть только у SQLite')
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='search-author')
+        cls.admin = User.objects.create_superuser(
+            username='search-admin', email='admin@yatube.ru', password='x')
+        cls.rare = Post.objects.create(
+            author=cls.author,
+            text='Котики гуляют по крыше',
+        )
+        cls.frequent = Post.objects.create(
+            author=cls.author,
+            text='Котики, котики и ещё раз котики',
+        )
+        cls.other = Post.objects.create(
+            author=cls.author,
+            text='Собаки охраняют дом',
+        )
+        cls.url = reverse('posts:search')
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_results_are_ranked(self):
+        """Посты с большим числом совпадений идут первыми."""
+        self.assertEqual(self.search('котики'), [self.frequent, self.rare])
+
+    def test_prefix_and_all_words(self):
+        """Слова ищутся по префиксу, и каждое слово обязательно."""
+        self.assertEqual(self.search('кот крыш'), [self.rare])
+        self.assertEqual(self.search('собак'), [self.other])
+
+    def test_fts_syntax_is_ignored(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.search('"собаки" (*'), [self.other])
+        self.assertEqual(self.search('"'), [])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Попугаи спят',
+        )
+        post.text = 'Кошки спят'
+        post.save()
+        self.assertEqual(self.search('попугаи'), [])
+        self.assertEqual(self.search('кошки'), [post])
+        post.delete()
+        self.assertEqual(self.search('кошки'), [])
+
+    def test_pagination_keeps_query(self):
+        """Ссылки пагинатора сохраняют поисковый запрос."""
+        Post.objects.bulk_create(
+            [Post(author=self.author, text=f'Котики {i}') for i in range(12)]
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get(self.url, {'q': 'котики'})
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA'
+                                      '%D0%B8&amp;page=2')
+        self.assertEqual(len(self.search('котики', page=2)), 4)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_search_index восстанавливает индекс по таблице
+        постов."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.assertEqual(self.search('собаки'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('собаки'), [self.other])
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт по полнотекстовому индексу."""
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котик'})
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.rare, self.frequent}
+        )
@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from posts.models import Post, User
+from posts.thumbnails import generate_thumbnails
+from sorl.thumbnail import default, get_thumbnail
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded_gif(name, content=SMALL_GIF):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear_lru()
+        # Миниатюры здесь режутся явно, а не в фоновом пуле.
+        patcher = mock.patch('posts.thumbnails.schedule_thumbnails')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author = User.objects.create_user(username='storage-author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.author, text=name, image=uploaded_gif(name))
+
+    def thumbnail(self, post):
+        geometry, options = settings.POST_IMAGE_THUMBNAILS[0]
+        return get_thumbnail(post.image, geometry, **options)
+
+    def test_identical_uploads_share_file_and_thumbnails(self):
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$')
+        generate_thumbnails(first.image.name)
+        self.assertEqual(self.thumbnail(second).url, self.thumbnail(first).url)
+        self.assertTrue(self.thumbnail(second).exists())
+
+    def test_file_is_deleted_with_last_post(self):
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        generate_thumbnails(first.image.name)
+        thumbnail = self.thumbnail(first)
+        storage = first.image.storage
+        name = first.image.name
+        first.delete()
+        self.assertTrue(storage.exists(name))
+        second.delete()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(thumbnail.exists())
+
+    def test_replaced_image_is_released(self):
+        post = self.create_post('first.gif')
+        old_name = post.image.name
+        post.image = uploaded_gif('other.gif', SMALL_GIF + b'\x00')
+        post.save()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(post.image.storage.exists(old_name))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+
+    def test_release_keeps_file_saved_again_meanwhile(self):
+        """Файл не удаляется, если его сохранили, пока шло освобождение.
+
+        Повторное сохранение находит готовый файл и ничего не пишет, а пост
+        с ним ещё не закоммичен.
+        """
+        post = self.create_post('first.gif')
+        storage = post.image.storage
+        name = post.image.name
+        storage.unclaim(name)
+
+        def in_use():
+            if not in_use.calls:
+                storage.save('posts/second.gif', uploaded_gif('second.gif'))
+            in_use.calls += 1
+            return False
+
+        in_use.calls = 0
+        self.assertFalse(storage.delete_unused(name, in_use))
+        self.assertTrue(storage.exists(name))
+        storage.unclaim(name)
+        self.assertTrue(storage.delete_unused(name, in_use))
+        self.assertFalse(storage.exists(name))
+
+    def test_claimed_file_is_kept_until_post_commits(self):
+        """Незакоммиченная загрузка той же картинки сохраняет файл."""
+        first = self.create_post('first.gif')
+        storage = first.image.storage
+        name = storage.save('posts/second.gif', uploaded_gif('second.gif'))
+        self.assertEqual(name, first.image.name)
+        first.delete()
+        self.assertTrue(storage.exists(name))
@@ -0,0 +1,177 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from posts.models import Post, User
+from posts.thumbnails import (generate_thumbnails, prefetch_thumbnails,
+                              schedule_thumbnails)
+from sorl.thumbnail import default, get_thumbnail
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded_gif(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name,
+        content=SMALL_GIF,
+        content_type='image/gif',
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailBackendTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='thumb-author')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Пост с картинкой',
+            image=uploaded_gif(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear_lru()
+        self.client.force_login(self.author)
+
+    def get_feed_thumbnail(self, post=None):
+        geometry, options = settings.POST_IMAGE_THUMBNAILS[0]
+        return get_thumbnail((post or self.post).image, geometry, **options)
+
+    def test_placeholder_until_generated(self):
+        """Пока миниатюры нет, шаблоны получают заглушку и не режут
+        картинку сами."""
+        self.assertEqual(
+            self.get_feed_thumbnail().url, settings.THUMBNAIL_DUMMY_SOURCE)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, settings.THUMBNAIL_DUMMY_SOURCE)
+        self.assertEqual(
+            self.get_feed_thumbnail().url, settings.THUMBNAIL_DUMMY_SOURCE)
+
+    def test_generated_thumbnail_is_used(self):
+        """После нарезки шаблоны получают готовую миниатюру."""
+        generate_thumbnails(self.post.image.name)
+        thumbnail = self.get_feed_thumbnail()
+        self.assertTrue(thumbnail.url.startswith(settings.MEDIA_URL))
+        self.assertTrue(thumbnail.exists())
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_prefetch_resolves_page_in_one_pass(self):
+        """Метаданные миниатюр страницы загружаются одним запросом, после
+        чего шаблонный тег не обращается ни к БД, ни к общему кешу."""
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.author,
+                text=f'Пост {i}',
+                image=uploaded_gif(f'small-{i}.gif'),
+            ) for i in range(3)
+        ]
+        for post in posts:
+            generate_thumbnails(post.image.name)
+        cache.clear()
+        default.kvstore.clear_lru()
+        with self.assertNumQueries(1):
+            prefetch_thumbnails(posts)
+        with mock.patch.object(cache, 'get') as cache_get:
+            with self.assertNumQueries(0):
+                for post in posts:
+                    thumbnail = self.get_feed_thumbnail(post)
+                    self.assertTrue(
+                        thumbnail.url.startswith(settings.MEDIA_URL))
+        cache_get.assert_not_called()
+
+    @override_settings(THUMBNAIL_LRU_SIZE=1)
+    def test_lru_is_bounded(self):
+        """Кеш в памяти процесса не растёт больше THUMBNAIL_LRU_SIZE."""
+        other = Post.objects.create(
+            author=self.author,
+            text='Другой пост',
+            image=uploaded_gif('other.gif'),
+        )
+        generate_thumbnails(self.post.image.name)
+        generate_thumbnails(other.image.name)
+        self.assertEqual(len(default.kvstore._lru), 1)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailQueueTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear_lru()
+        self.author = User.objects.create_user(username='queue-author')
+        self.client.force_login(self.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @mock.patch('posts.thumbnails.schedule_thumbnails')
+    def test_post_create_queues_thumbnails(self, schedule):
+        """Новая картинка отправляется на нарезку после коммита."""
+        self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded_gif()},
+        )
+        schedule.assert_called_once_with(Post.objects.get().image.name)
+
+    @mock.patch('posts.thumbnails.schedule_thumbnails')
+    def test_post_edit_without_new_image(self, schedule):
+        """Правка текста без новой картинки не перенарезает миниатюры."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост с картинкой',
+            image=uploaded_gif(),
+        )
+        schedule.reset_mock()
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Новый текст'},
+        )
+        schedule.assert_not_called()
+
+    @mock.patch('posts.thumbnails.schedule_thumbnails')
+    def test_image_saved_outside_views_is_queued(self, schedule):
+        """Картинка, сохранённая не через форму, тоже уходит на нарезку."""
+        post = Post.objects.create(
+            author=self.author, text='Из shell', image=uploaded_gif())
+        schedule.assert_called_once_with(post.image.name)
+
+    @mock.patch('posts.thumbnails.schedule_thumbnails')
+    def test_missing_thumbnail_is_queued(self, schedule):
+        """Промах в шаблоне снова ставит картинку в очередь."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=uploaded_gif())
+        schedule.reset_mock()
+        geometry, options = settings.POST_IMAGE_THUMBNAILS[0]
+        thumbnail = get_thumbnail(post.image, geometry, **options)
+        self.assertEqual(thumbnail.url, settings.THUMBNAIL_DUMMY_SOURCE)
+        schedule.assert_called_once_with(post.image.name)
+
+    @mock.patch('posts.thumbnails.get_executor')
+    def test_queue_is_deduplicated(self, get_executor):
+        """Картинка, которая уже ждёт нарезки, второй раз не ставится."""
+        schedule_thumbnails('posts/ab/ab.gif')
+        schedule_thumbnails('posts/ab/ab.gif')
+        get_executor.return_value.submit.assert_called_once()
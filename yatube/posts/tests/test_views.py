@@ -1,12 +1,19 @@
 import shutil
 import tempfile
+from http import HTTPStatus
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django import forms
+from django.db import connection
+from django.template.loader import render_to_string
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Group, Post, User
+from posts.counters import rebuild_counters
+from posts.models import Comment, Group, Post, User
+from posts.paginators import ElidedPaginator
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -202,11 +209,15 @@ class PaginatorTest(TestCase):
                 text=f'Test-text-{i}'
             ) for i in range(13)
             ])
+        rebuild_counters()
         cls.CONST = {
             'RECORD_ON_PAGE': 10,
             'LEFT_RECORDS': 3,
         }
 
+    def setUp(self):
+        cache.clear()
+
     def test_paginator(self):
         """Проверяем 10 записей на 1-ой странице и остаток на 2-ой"""
 
@@ -234,3 +245,219 @@ class PaginatorTest(TestCase):
         for route in routes:
             test_page_contains_ten_records(routes[route])
             test_page_contains_three_records(routes[route])
+
+
+class ElidedPaginatorTest(TestCase):
+    def test_elided_page_range(self):
+        paginator = ElidedPaginator(range(1000), 10)
+        ellipsis = ElidedPaginator.ELLIPSIS
+        cases = {
+            1: [1, 2, 3, 4, ellipsis, 100],
+            5: [1, 2, 3, 4, 5, 6, 7, 8, ellipsis, 100],
+            50: [1, ellipsis, 47, 48, 49, 50, 51, 52, 53, ellipsis, 100],
+            100: [1, ellipsis, 97, 98, 99, 100],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(list(paginator.get_elided_page_range(
+                    number, on_each_side=3, on_ends=1)), expected)
+        self.assertEqual(
+            list(ElidedPaginator(range(30), 10).get_elided_page_range(2)),
+            [1, 2, 3],
+        )
+
+    def test_paginator_html_size_does_not_depend_on_post_count(self):
+        """Пагинатор ленты из миллионов постов не больше, чем из сотни."""
+        for count in (100, 200_000, 10_000_000):
+            with self.subTest(count=count):
+                paginator = ElidedPaginator(range(count), 10)
+                page_obj = paginator.page(paginator.num_pages // 2)
+                html = render_to_string(
+                    'posts/includes/paginator.html', {'page_obj': page_obj})
+                self.assertIn(f'page={paginator.num_pages}', html)
+                # Номера страниц, два многоточия и четыре ссылки навигации.
+                self.assertLessEqual(html.count('<li'), 9 + 2 + 4)
+                self.assertLess(len(html), 5000)
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cursor-user')
+        cls.group = Group.objects.create(
+            title='Cursor-group', slug='cursor-slug',
+            description='test-description'
+        )
+        Post.objects.bulk_create(
+            [Post(
+                author=cls.author,
+                group=cls.group,
+                text=f'Test-text-{i}'
+            ) for i in range(13)
+            ])
+        rebuild_counters()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages(self):
+        """Курсорная пагинация (?after=) отдаёт ленту без пропусков и
+        повторов."""
+        routes = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+        )
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        for route in routes:
+            with self.subTest(route=route):
+                first_page = self.client.get(route + '?after=').context[
+                    'page_obj']
+                self.assertEqual(list(first_page), expected[:10])
+                self.assertTrue(first_page.has_next())
+                self.assertFalse(first_page.has_previous())
+                second_page = self.client.get(
+                    route + f'?after={first_page.next_cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(second_page), expected[10:])
+                self.assertFalse(second_page.has_next())
+                self.assertTrue(second_page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Битый курсор не ломает страницу, а отдаёт начало ленты."""
+        response = self.client.get(reverse('posts:index') + '?after=broken')
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='feed-author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Feed-group', slug='feed-slug',
+            description='test-description'
+        )
+        cls.profile_url = reverse(
+            'posts:profile', kwargs={'username': cls.author})
+        cls.routes = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}): 3,
+            cls.profile_url: 2,
+        }
+
+    def create_posts(self, count):
+        Post.objects.bulk_create(
+            [Post(
+                author=User.objects.create_user(
+                    username=f'feed-user-{count}-{i}'
+                ) if i % 2 else self.author,
+                group=self.group,
+                text=f'Test-text-{i}'
+            ) for i in range(count)
+            ])
+        rebuild_counters()
+
+    def test_feed_query_count_does_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        for posts_count in (2, 20):
+            self.create_posts(posts_count)
+            for route, queries in self.routes.items():
+                with self.subTest(route=route, posts_count=posts_count):
+                    cache.clear()
+                    with self.assertNumQueries(queries):
+                        self.client.get(route)
+
+    def test_feeds_do_not_count_all_posts(self):
+        """Ленты не считают посты через COUNT(*) по всей таблице.
+
+        Профиль берёт число постов из AuthorStats, главная и группа
+        считают маленькие ленты запросом с LIMIT.
+        """
+        self.create_posts(20)
+        for route in self.routes:
+            with self.subTest(route=route):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(route)
+                counts = [
+                    query['sql'] for query in queries
+                    if 'COUNT(' in query['sql']
+                ]
+                if route == self.profile_url:
+                    self.assertEqual(counts, [])
+                for sql in counts:
+                    self.assertIn('LIMIT', sql)
+
+
+class PostCommentsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='comment-author')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Пост с обсуждением',
+        )
+        Comment.objects.bulk_create(
+            [Comment(
+                author=User.objects.create_user(username=f'commenter-{i}'),
+                post=cls.post,
+                text=f'Комментарий {i}',
+            ) for i in range(25)
+            ])
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.id})
+        cls.comments_url = reverse(
+            'posts:post_comments', kwargs={'post_id': cls.post.id})
+
+    def test_post_detail_shows_first_comments(self):
+        """На странице поста первая порция комментариев от старых к новым."""
+        response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+        expected = list(self.post.comments.order_by('created', 'id'))
+        self.assertEqual(list(comments), expected[:20])
+        self.assertContains(response, 'Комментарий 0')
+        self.assertContains(
+            response, f'href="{self.detail_url}?after={comments.next_cursor}"')
+        self.assertContains(
+            response,
+            f'data-comments-url="{self.comments_url}'
+            f'?after={comments.next_cursor}"')
+        self.assertContains(response, 'js/comments.js')
+
+    def test_post_detail_continues_thread(self):
+        """Без JavaScript ссылка ведёт на страницу поста со следующей
+        порцией комментариев."""
+        cursor = self.client.get(self.detail_url).context[
+            'comments'].next_cursor
+        response = self.client.get(self.detail_url + f'?after={cursor}')
+        self.assertTemplateUsed(response, 'posts/post_detail.html')
+        expected = list(self.post.comments.order_by('created', 'id'))
+        self.assertEqual(list(response.context['comments']), expected[20:])
+
+    def test_comments_partial_continues_thread(self):
+        """Отдельный адрес комментариев отдаёт следующую порцию."""
+        cursor = self.client.get(self.detail_url).context[
+            'comments'].next_cursor
+        response = self.client.get(self.comments_url + f'?after={cursor}')
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        expected = list(self.post.comments.order_by('created', 'id'))
+        self.assertEqual(list(response.context['comments']), expected[20:])
+        self.assertFalse(response.context['comments'].has_next())
+
+    def test_comment_authors_are_joined(self):
+        """Авторы комментариев загружаются вместе с комментариями."""
+        with self.assertNumQueries(2):
+            self.client.get(self.comments_url)
+
+    def test_comments_of_missing_post(self):
+        """Комментарии несуществующего поста возвращают 404."""
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def execute_on_commit(using=DEFAULT_DB_ALIAS):
+    """Выполняет колбэки transaction.on_commit, добавленные в блоке.
+
+    TestCase не коммитит транзакцию, поэтому без этого такие колбэки не
+    выполняются никогда (аналог captureOnCommitCallbacks из Django 3.2).
+    Колбэки выполняются и если блок завершился исключением: откаченные
+    точки сохранения Django уже убрал из очереди.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    try:
+        yield
+    finally:
+        while len(connection.run_on_commit) > start:
+            _, callback = connection.run_on_commit.pop(start)
+            callback()
@@ -0,0 +1,275 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core.instrumentation import record, timed
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail import delete as delete_image
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import DummyImageFile, ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .feed_cache import invalidate_feeds, post_feeds
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+class QueuedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который не режет картинки во время рендера.
+
+    Шаблон получает миниатюру только из хранилища ключ-значение, а если её
+    ещё нет — заглушку THUMBNAIL_DUMMY_SOURCE, и картинка ставится в
+    очередь на нарезку. Сами миниатюры создаются в фоне функцией
+    schedule_thumbnails.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        with timed('thumb'):
+            cached = default.kvstore.get(
+                self.thumbnail_file(file_, geometry_string, options)
+            )
+        if cached:
+            return cached
+        # Задание могло потеряться при перезапуске процесса, а картинку
+        # могли сохранить в обход форм (админка, shell, фикстуры).
+        queue_thumbnails(getattr(file_, 'name', file_))
+        return DummyImageFile(geometry_string)
+
+    def thumbnail_file(self, file_, geometry_string, options):
+        """Файл миниатюры, под которым она записана в хранилище."""
+        source = ImageFile(file_)
+        options = dict(options)
+        self._set_default_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def generate_thumbnail(self, file_, geometry_string, **options):
+        """Создаёт миниатюру, как это делает стандартный бэкенд."""
+        return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _set_default_options(self, source, options):
+        # Те же умолчания, что в ThumbnailBackend.get_thumbnail: от них
+        # зависит имя файла миниатюры.
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+
+
+class LRUKVStore(KVStore):
+    """Хранилище метаданных sorl-thumbnail с LRU-кешем в памяти процесса.
+
+    Перед общим кешем Django и таблицей thumbnail_kvstore стоит словарь
+    последних найденных записей. Метод prefetch заполняет его для целой
+    страницы ленты одним get_many и одним запросом к БД.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > settings.THUMBNAIL_LRU_SIZE:
+                self._lru.popitem(last=False)
+
+    def _forget(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._lru.pop(key, None)
+
+    def clear_lru(self):
+        with self._lock:
+            self._lru.clear()
+
+    def _get_raw(self, key):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+        value = super()._get_raw(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self._remember(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        self._forget(*keys)
+
+    def prefetch(self, image_files):
+        """Загружает записи для нескольких картинок за один проход."""
+        with self._lock:
+            keys = {
+                add_prefix(image_file.key) for image_file in image_files
+            } - self._lru.keys()
+        if not keys:
+            return
+        found = self.cache.get_many(keys)
+        missing = keys - found.keys()
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            self.cache.set_many(
+                {key: stored.get(key, EMPTY_VALUE) for key in missing},
+                sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+            found.update(stored)
+        for key, value in found.items():
+            if value != EMPTY_VALUE:
+                self._remember(key, value)
+
+
+def prefetch_thumbnails(posts):
+    """Готовит метаданные миниатюр всех постов страницы до рендера."""
+    with timed('thumb'):
+        default.kvstore.prefetch(
+            default.backend.thumbnail_file(post.image, geometry, options)
+            for post in posts if post.image
+            for geometry, options in settings.POST_IMAGE_THUMBNAILS
+        )
+
+
+def post_image(name):
+    """Картинка поста в хранилище поля Post.image.
+
+    Ключ sorl-thumbnail зависит от хранилища, поэтому и нарезка, и
+    шаблоны должны видеть картинку через одно и то же хранилище.
+    """
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def generate_thumbnails(name):
+    """Создаёт миниатюры картинки поста во всех размерах из настроек.
+
+    Страницы с постами этой картинки показывали заглушку, поэтому их кеш
+    и версии для условных запросов сбрасываются.
+    """
+    source = post_image(name)
+    for geometry, options in settings.POST_IMAGE_THUMBNAILS:
+        default.backend.generate_thumbnail(source, geometry, **options)
+    for post in Post.objects.filter(image=name).select_related(
+        'author', 'group'
+    ):
+        invalidate_feeds(*post_feeds(post))
+
+
+def release_image(name):
+    """После коммита удаляет картинку и её миниатюры, если на неё больше
+    не ссылается ни один пост.
+
+    Одинаковые картинки хранятся одним файлом (ContentAddressedStorage),
+    поэтому удалять его вместе с постом можно только последним.
+    """
+    def release():
+        source = post_image(name)
+        if source.storage.delete_unused(
+            name, Post.objects.filter(image=name).exists
+        ):
+            delete_image(source, delete_file=False)
+
+    if name:
+        transaction.on_commit(release)
+
+
+def unclaim_images(names):
+    """После коммита снимает с картинок метки сохранения: теперь их
+    защищают ссылки из постов."""
+    storage = Post._meta.get_field('image').storage
+    names = [name for name in names if name]
+
+    def unclaim():
+        for name in names:
+            storage.unclaim(name)
+
+    if names:
+        transaction.on_commit(unclaim)
+
+
+def release_unsaved_images(names):
+    """Освобождает картинки, посты с которыми так и не сохранились."""
+    storage = Post._meta.get_field('image').storage
+    for name in names:
+        if name:
+            storage.unclaim(name)
+            release_image(name)
+
+
+def _queued_key(name):
+    return f'thumbnails-queued:{name}'
+
+
+def _generate_in_worker(name):
+    started = time.perf_counter()
+    try:
+        generate_thumbnails(name)
+        if settings.INSTRUMENTATION_ENABLED:
+            record(
+                'thumbnails', 'generate',
+                (time.perf_counter() - started) * 1000
+            )
+        cache.delete(_queued_key(name))
+    except Exception:
+        # Метка остаётся до THUMBNAIL_QUEUE_TIMEOUT, чтобы битая картинка
+        # не отправлялась на нарезку с каждым рендером.
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        # Соединения с БД у каждого потока свои.
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def schedule_thumbnails(name):
+    """Ставит создание миниатюр картинки в очередь пула потоков.
+
+    Метка в общем кеше не даёт поставить одну картинку в очередь дважды,
+    в том числе из разных процессов. Если процесс с заданием перезапустят,
+    метка истечёт через THUMBNAIL_QUEUE_TIMEOUT и следующий промах
+    поставит задание снова.
+    """
+    if not cache.add(
+        _queued_key(name), True, settings.THUMBNAIL_QUEUE_TIMEOUT
+    ):
+        return None
+    return get_executor().submit(_generate_in_worker, name)
+
+
+def queue_thumbnails(name):
+    """После коммита отправляет картинку поста на нарезку миниатюр."""
+    if name:
+        transaction.on_commit(lambda: schedule_thumbnails(name))
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+def is_popular(author_id):
+    """У популярных авторов посты не раскладываются по лентам подписчиков,
+    а читаются из таблицы постов при показе ленты."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FOLLOW_FANOUT_LIMIT,
+    ).exists()
+
+
+def fan_out_post(post):
+    """Записывает новый пост в ленты подписчиков автора."""
+    if is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers.iterator()],
+        batch_size=settings.FOLLOW_FANOUT_BATCH,
+    )
+
+
+def fan_out_posts(posts):
+    """Раскладывает пачку новых постов по лентам подписчиков авторов.
+
+    В отличие от fan_out_post подписчики всех авторов пачки читаются
+    одним запросом, что нужно для массового импорта.
+    """
+    author_ids = {post.author_id for post in posts}
+    popular = set(AuthorStats.objects.filter(
+        user_id__in=author_ids,
+        followers_count__gt=settings.FOLLOW_FANOUT_LIMIT,
+    ).values_list('user_id', flat=True))
+    followers = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=author_ids - popular
+    ).values_list('user_id', 'author_id').iterator():
+        followers[author_id].append(user_id)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for post in posts for user_id in followers[post.author_id]],
+        batch_size=settings.FOLLOW_FANOUT_BATCH,
+    )
+
+
+def backfill(user, author):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    if is_popular(author.pk):
+        return
+    posts = author.posts.order_by('-pub_date', '-id').values_list(
+        'pk', 'pub_date'
+    )[:settings.FOLLOW_BACKFILL_POSTS]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=user, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts],
+        batch_size=settings.FOLLOW_FANOUT_BATCH,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_followers(author_id):
+    """Добавляет последние посты автора в ленты всех его подписчиков.
+
+    Пока у автора было больше FOLLOW_FANOUT_LIMIT подписчиков, его посты
+    не раскладывались по лентам, а новые подписчики не получали backfill.
+    Когда подписчиков становится не больше лимита, посты снова читаются
+    только из лент, поэтому ленты дополняются так же, как при подписке.
+    """
+    posts = list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('pk', 'pub_date')[:settings.FOLLOW_BACKFILL_POSTS])
+    if not posts:
+        return
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).iterator()
+    users_per_batch = max(1, settings.FOLLOW_FANOUT_BATCH // len(posts))
+    while True:
+        users = list(islice(followers, users_per_batch))
+        if not users:
+            return
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+             for user_id in users for pk, pub_date in posts],
+            batch_size=settings.FOLLOW_FANOUT_BATCH,
+            ignore_conflicts=True,
+        )
+
+
+def backfill_if_no_longer_popular(author_id):
+    """После отписки от автора, у которого подписчиков стало ровно
+    FOLLOW_FANOUT_LIMIT, после коммита дополняет ленты его подписчиков."""
+    if AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.FOLLOW_FANOUT_LIMIT,
+    ).exists():
+        transaction.on_commit(lambda: backfill_followers(author_id))
+
+
+def follow(user, author):
+    _, created = Follow.objects.get_or_create(user=user, author=author)
+    if created:
+        backfill(user, author)
+
+
+def unfollow(user, author):
+    Follow.objects.filter(user=user, author=author).delete()
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def timeline_posts(user):
+    """Посты ленты подписок пользователя.
+
+    Обычно это один проход по индексу (user, -pub_date) таблицы ленты.
+    Посты популярных авторов, которые не раскладывались по лентам,
+    добавляются к ней при чтении.
+    """
+    popular = list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.FOLLOW_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+    posts = Post.objects.for_feed()
+    if not popular:
+        return posts.filter(timeline__user=user).order_by(
+            '-timeline__pub_date', '-pk'
+        )
+    return posts.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=popular)
+    )
+
+
+def rebuild_timelines():
+    """Заново раскладывает посты по лентам всех подписчиков."""
+    TimelineEntry.objects.all().delete()
+    for item in Follow.objects.select_related('user', 'author').iterator():
+        backfill(item.user, item.author)
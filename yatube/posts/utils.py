@@ -0,0 +1,61 @@
+from django.conf import settings
+
+from .feed_cache import set_rendered_page
+from .models import Comment
+from .paginators import CursorPaginator, ElidedPaginator
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+
+def feed_count(feed, posts, cached_count):
+    """Число постов ленты feed для пагинатора или None для COUNT(*).
+
+    Если в FEED_COUNTS лента помечена как 'approximate', большие ленты
+    получают закешированное число cached_count(). Маленькие считаются
+    точно, но запросом с LIMIT, который не читает больше
+    FEED_EXACT_COUNT_LIMIT строк.
+    """
+    if settings.FEED_COUNTS.get(feed, 'exact') != 'approximate':
+        return None
+    limit = settings.FEED_EXACT_COUNT_LIMIT
+    exact = posts[:limit].count()
+    if exact < limit:
+        return exact
+    return max(cached_count(), limit)
+
+
+def paginate(request, posts, count=None):
+    """Возвращает страницу ленты постов.
+
+    По умолчанию используется обычная пагинация по номеру страницы
+    (?page=N); функция count, если задана, заменяет подсчёт постов. Запрос с
+    параметром ?after=<cursor> переключает ленту на курсорную пагинацию
+    без COUNT и OFFSET.
+    """
+    if 'after' in request.GET:
+        paginator = CursorPaginator(posts, POSTS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('after'))
+    else:
+        paginator = ElidedPaginator(
+            posts, POSTS_PER_PAGE, count=count() if count else None
+        )
+        page_obj = paginator.get_page(request.GET.get('page'))
+    set_rendered_page(request, page_obj)
+    return page_obj
+
+
+def paginate_comments(request, post_id):
+    """Возвращает порцию комментариев поста от старых к новым.
+
+    Комментарии листаются курсором (?after=<cursor>), поэтому даже у поста
+    с тысячами комментариев каждая порция выбирается по индексу
+    (post, created) без COUNT и OFFSET.
+    """
+    comments = Comment.objects.filter(
+        post_id=post_id
+    ).select_related('author')
+    paginator = CursorPaginator(
+        comments, COMMENTS_PER_PAGE, field='created', descending=False
+    )
+    return paginator.get_page(request.GET.get('after'))
@@ -1,28 +1,65 @@
+from core.db_router import pin_to_primary, read_from_replica
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import (Http404, HttpResponseBadRequest,
+                         StreamingHttpResponse)
+from django.utils.http import urlencode
 from django.shortcuts import get_object_or_404, redirect, render
 
+from .counters import index_posts_count
+from .exporter import FORMATS, KINDS, export, export_filename
+from .feed_cache import (INDEX_FEED, cache_feed, conditional_feed, group_feed,
+                         post_page, profile_feed)
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Comment
+from .models import Follow, Group, Post, User
+from .paginators import ElidedPaginator
+from .search import SearchResults, search_available
+from .thumbnails import prefetch_thumbnails
+from .timelines import follow, timeline_posts, unfollow
+from .utils import (POSTS_PER_PAGE, feed_count, paginate,
+                    paginate_comments)
 
 
+def post_detail_feeds(post_id):
+    """Страница поста зависит от самого поста, его комментариев, числа
+    постов и имени автора, которые меняются вместе с его лентой, и от
+    названия группы, которое меняется вместе с лентой группы."""
+    names = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug'
+    ).first()
+    if names is None:
+        return None
+    username, slug = names
+    feeds = [post_page(post_id), profile_feed(username)]
+    if slug is not None:
+        feeds.append(group_feed(slug))
+    return feeds
+
+
+@conditional_feed(lambda: [INDEX_FEED])
+@cache_feed(lambda: INDEX_FEED)
+@read_from_replica
 def index(request):
-    posts_list = Post.objects.all()
-    paginator = Paginator(posts_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts_list = Post.objects.for_feed()
+    page_obj = paginate(request, posts_list, lambda: feed_count(
+        'index', posts_list, index_posts_count))
+    prefetch_thumbnails(page_obj)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_feed(lambda slug: [group_feed(slug)])
+@cache_feed(group_feed)
+@read_from_replica
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
-    paginator = Paginator(posts_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts_list = group.posts.for_feed()
+    page_obj = paginate(request, posts_list, lambda: feed_count(
+        'group', posts_list, lambda: group.posts_count))
+    prefetch_thumbnails(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -30,15 +67,24 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_feed(lambda username: [profile_feed(username)])
+@cache_feed(profile_feed)
+@read_from_replica
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
-    count = post_list.count()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.for_feed()
+    stats = getattr(author, 'stats', None)
+    count = stats.posts_count if stats else 0
+    page_obj = paginate(request, post_list, lambda: count)
+    prefetch_thumbnails(page_obj)
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=author
+    ).exists()
     context = {
         'count': count,
+        'following': following,
         'author': author,
         'post_list': post_list,
         'page_obj': page_obj,
@@ -46,19 +92,51 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    if search_available():
+        results = SearchResults(query)
+    else:
+        results = Post.objects.for_feed().filter(text__icontains=query)
+    paginator = ElidedPaginator(results if query else [], POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    prefetch_thumbnails(page_obj)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@conditional_feed(post_detail_feeds)
+@read_from_replica
 def post_detail(request, post_id):
-    one_post = get_object_or_404(Post, id=post_id)
+    one_post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
     form = CommentForm(request.POST or None)
-    comment = Comment.objects.filter(post=post_id)
+    comments = paginate_comments(request, post_id)
     context = {
         'one_post': one_post,
         'form': form,
-        'comment': comment,
+        'comments': comments,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post_id': post_id,
+        'comments': paginate_comments(request, post_id),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
+@pin_to_primary
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -74,6 +152,8 @@ def post_create(request):
 
 
 @login_required
+@pin_to_primary
+@transaction.atomic
 def post_edit(request, post_id):
     object_post = get_object_or_404(Post, id=post_id)
     if object_post.author == request.user:
@@ -94,6 +174,8 @@ def post_edit(request, post_id):
 
 
 @login_required
+@pin_to_primary
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -103,3 +185,62 @@ def add_comment(request, post_id):
         comment.post = post
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+def follow_index(request):
+    page_obj = paginate(request, timeline_posts(request.user))
+    prefetch_thumbnails(page_obj)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@login_required
+@transaction.atomic
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        follow(request.user, author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+@transaction.atomic
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    unfollow(request.user, author)
+    return redirect('posts:profile', username=username)
+
+
+@staff_member_required
+def export_posts(request, kind):
+    if kind not in KINDS:
+        raise Http404
+    format = request.GET.get('format', 'jsonl')
+    if format not in FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки.')
+    compress = request.GET.get('gzip') == '1'
+    try:
+        content = export(
+            kind,
+            format=format,
+            compress=compress,
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+            author=request.GET.get('author'),
+            group=request.GET.get('group'),
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    if compress:
+        content_type = 'application/gzip'
+    elif format == 'csv':
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        content_type = 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(content, content_type=content_type)
+    filename = export_filename(kind, format, compress)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,27 @@
+// Подгружает следующую порцию комментариев без перезагрузки страницы.
+// Без JavaScript ссылка «Показать ещё комментарии» открывает страницу
+// поста с ?after=<cursor>; здесь та же порция берётся с posts:post_comments,
+// который отдаёт только список комментариев и новую ссылку.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('a[data-comments-url]');
+  if (!link || link.dataset.loading) {
+    return;
+  }
+  event.preventDefault();
+  link.dataset.loading = 'true';
+  fetch(link.dataset.commentsUrl, {
+    headers: {'X-Requested-With': 'XMLHttpRequest'},
+    credentials: 'same-origin'
+  }).then(function (response) {
+    if (!response.ok) {
+      throw new Error(response.status);
+    }
+    return response.text();
+  }).then(function (html) {
+    var template = document.createElement('template');
+    template.innerHTML = html;
+    link.replaceWith(template.content);
+  }).catch(function () {
+    window.location.href = link.href;
+  });
+});
@@ -0,0 +1,28 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI handler of its own, so the WSGI application is served
+through asgiref's WsgiToAsgi, which runs it in a thread pool (its size is
+set by the ASGI_THREADS environment variable), e.g.:
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+from core.asgi import join_cookie_headers  # noqa: E402
+from core.fileserver import FileServer  # noqa: E402
+from core.template_backend import warm_up_templates  # noqa: E402
+
+wsgi_application = get_wsgi_application()
+if settings.SERVE_FILES:
+    wsgi_application = FileServer(wsgi_application)
+application = join_cookie_headers(WsgiToAsgi(wsgi_application))
+warm_up_templates()
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -23,7 +25,8 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '_89d!oq($-%alsno%a^n1%%o8bh(z&mk6%a9jl(a@ubs1^a=6h'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Боевой режим включается переменной окружения DJANGO_DEBUG=0.
+DEBUG = os.environ.get('DJANGO_DEBUG', '1').lower() not in ('0', 'false')
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -56,17 +59,29 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.InstrumentationMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# В боевом режиме шаблоны разбираются один раз на процесс: их держит
+# кеширующий загрузчик, а yatube/wsgi.py и yatube/asgi.py компилируют
+# все шаблоны заранее (core.template_backend.warm_up_templates).
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+TEMPLATE_CACHE = not DEBUG
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_CACHE else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -84,12 +99,48 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# В боевом режиме соединения с БД живут CONN_MAX_AGE секунд и
+# переиспользуются между запросами; runserver открывает поток на каждый
+# запрос, поэтому при разработке соединения закрываются сразу.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 0 if DEBUG else 60,
+    },
+    # Реплика для чтения лент. Локально это второй файл SQLite, который
+    # обновляется командой sync_replica.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db-replica.sqlite3'),
+        'CONN_MAX_AGE': 0 if DEBUG else 60,
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Настройки каждого соединения с SQLite в боевом режиме. В режиме WAL
+# чтения не ждут записи комментариев и постов; synchronous=NORMAL в WAL не
+# теряет целостность при сбое процесса. cache_size задаётся в КиБ (со
+# знаком минус), busy_timeout — в миллисекундах. При разработке база
+# работает с настройками SQLite по умолчанию.
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
 }
+SQLITE_PRAGMAS = {} if DEBUG else SQLITE_PRODUCTION_PRAGMAS
+
+# Алиас базы, с которой читают ленты и страница поста; None — читать из
+# default. После записи автор REPLICA_STICKY_SECONDS секунд читает из
+# основной базы, чтобы видеть свои изменения.
+REPLICA_DATABASE = None
+REPLICA_STICKY_SECONDS = 10
 
 
 # Password validation
@@ -132,6 +183,13 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# В боевом режиме collectstatic добавляет хеши к именам файлов и кладёт
+# рядом сжатые копии .gz (и .br, если установлен brotli).
+if not DEBUG:
+    STATICFILES_STORAGE = (
+        'core.staticfiles.CompressedManifestStaticFilesStorage'
+    )
 
 
 LOGIN_URL = 'users:login'
@@ -151,3 +209,106 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# В боевом режиме STATIC_ROOT и MEDIA_ROOT отдаёт core.fileserver.FileServer
+# в точках входа WSGI и ASGI, не доходя до Django. Файлы с хешем в имени
+# кешируются навсегда, остальные — на FILE_SERVER_MAX_AGE секунд.
+SERVE_FILES = not DEBUG
+FILE_SERVER_MAX_AGE = 60 * 60
+
+# Номера страниц в пагинаторе лент: по PAGINATOR_ON_ENDS в начале и
+# в конце и по PAGINATOR_ON_EACH_SIDE вокруг текущей, остальные
+# заменяются многоточием.
+PAGINATOR_ON_EACH_SIDE = 3
+PAGINATOR_ON_ENDS = 1
+
+# Как пагинатор узнаёт число постов в ленте: 'exact' — COUNT(*) на каждый
+# запрос, 'approximate' — закешированный счётчик (общий для главной,
+# Group.posts_count для группы). Ленты меньше FEED_EXACT_COUNT_LIMIT
+# постов всё равно считаются точно. Счётчик главной пересчитывается раз
+# в FEED_COUNT_TIMEOUT секунд.
+FEED_COUNTS = {
+    'index': 'approximate',
+    'group': 'approximate',
+}
+FEED_EXACT_COUNT_LIMIT = 1000
+FEED_COUNT_TIMEOUT = 60 * 5
+
+# Кеш общий для всех процессов и потоков сервера: в нём лежат версии лент,
+# страницы лент, счётчик постов главной, метаданные миниатюр и метки
+# сохраняемых картинок, и сброс версии в одном процессе должны видеть все
+# остальные. В боевом режиме обязателен общий сервер кеша (например,
+# memcached), заданный DJANGO_CACHE_BACKEND и DJANGO_CACHE_LOCATION: в нём
+# add и incr атомарны, а вытеснение не перебирает все записи. Файловый кеш
+# по умолчанию годится только для разработки. Тесты получают свой кеш во
+# временном каталоге, см. core.test_runner.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'DJANGO_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.environ.get(
+            'DJANGO_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+    },
+}
+if not DEBUG and (
+    CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS
+    or 'DJANGO_CACHE_LOCATION' not in os.environ
+):
+    raise ImproperlyConfigured(
+        'В боевом режиме задайте общий сервер кеша переменными '
+        'DJANGO_CACHE_BACKEND и DJANGO_CACHE_LOCATION.'
+    )
+
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Время жизни закешированных страниц лент для анонимных пользователей;
+# при изменении постов кеш сбрасывается сигналами раньше.
+FEED_CACHE_TIMEOUT = 60 * 15
+
+# Загруженные картинки постов уменьшаются до POST_IMAGE_MAX_SIZE и
+# перекодируются в POST_IMAGE_FORMAT ('WEBP' или 'JPEG'); оригиналы не
+# хранятся. Загрузки больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во
+# временные файлы, а не держатся в памяти.
+POST_IMAGE_MAX_SIZE = (1920, 1920)
+POST_IMAGE_FORMAT = 'WEBP'
+POST_IMAGE_QUALITY = 80
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024
+
+# Миниатюры картинок постов: sorl-thumbnail отдаёт в шаблоны только готовые
+# миниатюры, а создаются они в фоне сразу после сохранения картинки.
+THUMBNAIL_BACKEND = 'posts.thumbnails.QueuedThumbnailBackend'
+THUMBNAIL_KVSTORE = 'posts.thumbnails.LRUKVStore'
+THUMBNAIL_LRU_SIZE = 2048
+THUMBNAIL_DUMMY_SOURCE = STATIC_URL + 'img/thumbnail-placeholder.svg'
+THUMBNAIL_WORKERS = 2
+# Через сколько секунд картинку можно снова поставить в очередь на нарезку,
+# если задание не выполнилось (процесс перезапустили или нарезка упала).
+THUMBNAIL_QUEUE_TIMEOUT = 60 * 5
+POST_IMAGE_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+# Лента подписок: посты авторов, у которых не больше FOLLOW_FANOUT_LIMIT
+# подписчиков, раскладываются по лентам при публикации; посты более
+# популярных авторов добавляются к ленте при чтении. Новый подписчик и все
+# подписчики автора, который перестал быть популярным, получают в ленту
+# последние FOLLOW_BACKFILL_POSTS его постов.
+FOLLOW_FANOUT_LIMIT = 10000
+FOLLOW_FANOUT_BATCH = 1000
+FOLLOW_BACKFILL_POSTS = 1000
+
+# Замеры SQL, рендера шаблонов и миниатюр для каждого запроса: заголовок
+# Server-Timing и гистограммы, которые выводит команда instrumentation.
+# Процессы сбрасывают гистограммы в INSTRUMENTATION_DIR не чаще раза в
+# INSTRUMENTATION_FLUSH_INTERVAL секунд и при выходе.
+INSTRUMENTATION_ENABLED = False
+INSTRUMENTATION_DIR = os.path.join(BASE_DIR, 'instrumentation')
+INSTRUMENTATION_FLUSH_INTERVAL = 30
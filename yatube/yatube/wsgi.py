@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+from core.fileserver import FileServer  # noqa: E402
+from core.template_backend import warm_up_templates  # noqa: E402
+
+if settings.SERVE_FILES:
+    application = FileServer(application)
+warm_up_templates()